@@ -7,10 +7,11 @@ class AgentAdmin(UserAdmin):
     list_display = ['username', 'nom', 'email', 'role', 'is_active', 'created_at']
     list_filter = ['role', 'is_active', 'created_at']
     search_fields = ['username', 'nom', 'email']
+    readonly_fields = ['has_face_encoding', 'face_encoding_version']
     
     fieldsets = UserAdmin.fieldsets + (
         ('Informations supplémentaires', {
-            'fields': ('nom', 'role', 'photo', 'face_encoding')
+            'fields': ('nom', 'role', 'photo', 'has_face_encoding', 'face_encoding_version')
         }),
     )
     
@@ -18,4 +19,8 @@ class AgentAdmin(UserAdmin):
         ('Informations supplémentaires', {
             'fields': ('nom', 'role', 'photo')
         }),
-    )
\ No newline at end of file
+    )
+    
+    @admin.display(boolean=True, description='Encodage du visage')
+    def has_face_encoding(self, obj):
+        return bool(obj.face_encoding)
\ No newline at end of file
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class AgentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'agents'
\ No newline at end of file
+    name = 'agents'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,105 @@
+"""
+Authentification JWT sans lecture de l'agent en base à chaque requête
+
+L'identifiant, le rôle et l'état actif de l'agent sont signés dans le jeton
+au login (tokens_for_agent). Chaque requête ne vérifie plus qu'un petit état
+de révocation par agent, lu dans le cache (AUTH_STATE_CACHE_TIMEOUT) et
+invalidé dès que l'agent est modifié :
+
+- agent désactivé ou supprimé : jeton refusé ;
+- rôle modifié : jeton refusé (l'agent se reconnecte pour obtenir le nouveau rôle) ;
+- mot de passe modifié : tous les jetons existants sont révoqués.
+
+Les jetons émis avant ces claims retombent sur la lecture en base de
+JWTAuthentication.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Agent
+
+STATE_KEY = 'agent_auth:{}'
+
+
+def password_fingerprint(password_hash):
+    """
+    Empreinte courte du hash du mot de passe (ne révèle pas le hash)
+    """
+    return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+
+def tokens_for_agent(agent):
+    """
+    Émet le couple refresh/access avec les claims de l'agent
+    """
+    refresh = RefreshToken.for_user(agent)
+    refresh['role'] = agent.role
+    refresh['nom'] = agent.nom
+    refresh['is_active'] = agent.is_active
+    refresh['pwd'] = password_fingerprint(agent.password)
+    return refresh
+
+
+def get_auth_state(agent_id):
+    """
+    Retourne {'is_active', 'role', 'pwd'} pour un agent (None s'il n'existe plus)
+    """
+    key = STATE_KEY.format(agent_id)
+    state = cache.get(key)
+    if state is None:
+        row = Agent.objects.filter(id=agent_id).values_list('is_active', 'role', 'password').first()
+        state = {'exists': False}
+        if row is not None:
+            is_active, role, password = row
+            state = {'exists': True, 'is_active': is_active, 'role': role, 'pwd': password_fingerprint(password)}
+        cache.set(key, state, getattr(settings, 'AUTH_STATE_CACHE_TIMEOUT', 60))
+    return state if state['exists'] else None
+
+
+def invalidate_auth_state(agent_id):
+    cache.delete(STATE_KEY.format(agent_id))
+
+
+class AgentTokenUser(TokenUser):
+    """
+    Agent reconstruit à partir des claims du jeton (sans requête)
+    """
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def nom(self):
+        return self.token.get('nom', '')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', False)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication qui fait confiance aux claims signés, sous réserve de l'état de révocation
+    """
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return super().get_user(validated_token)
+
+        user = AgentTokenUser(validated_token)
+        state = get_auth_state(user.id)
+        if state is None:
+            raise AuthenticationFailed("Agent introuvable.", code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed("Compte désactivé.", code='user_inactive')
+        if state['role'] != user.role or state['pwd'] != validated_token.get('pwd'):
+            raise AuthenticationFailed("Session expirée, veuillez vous reconnecter.", code='token_revoked')
+        return user
@@ -0,0 +1,27 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password
+
+from .models import Agent
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authentification par email : une seule requête sur l'index unique de l'email
+
+    Un compte désactivé est retourné si le mot de passe est correct : c'est à
+    l'appelant de vérifier is_active (message « Compte désactivé. » du login).
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        try:
+            agent = Agent.objects.get(email=email)
+        except Agent.DoesNotExist:
+            # Même coût qu'un mot de passe incorrect, avec le hasher le plus
+            # coûteux (PBKDF2 par défaut) : ne révèle pas les emails existants
+            make_password(password, hasher='default')
+            return None
+        if agent.check_password(password):
+            return agent
+        return None
@@ -0,0 +1,19 @@
+"""
+Hachage des mots de passe des comptes kiosque
+
+Les opérateurs (KIOSK_ROLES) se connectent en masse aux changements d'équipe
+depuis les postes de l'atelier : leur hash PBKDF2 utilise un nombre
+d'itérations réglable (KIOSK_PASSWORD_ITERATIONS), les autres comptes gardent
+le hasher par défaut de Django. Les hash existants sont convertis à la
+connexion suivante, y compris quand le réglage change.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class KioskPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    algorithm = 'pbkdf2_sha256_kiosk'
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'KIOSK_PASSWORD_ITERATIONS', PBKDF2PasswordHasher.iterations)
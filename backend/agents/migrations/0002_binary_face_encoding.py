@@ -0,0 +1,55 @@
+import json
+import struct
+
+from django.db import migrations, models
+
+# Copie figée du format de face_recognition_app.encoding_codec (version 1)
+HEADER = struct.Struct('<4sBc2x')
+
+
+def json_to_binary(apps, schema_editor):
+    Agent = apps.get_model('agents', 'Agent')
+    agents = Agent.objects.exclude(face_encoding__isnull=True).exclude(face_encoding='')
+    for agent in agents.iterator():
+        values = json.loads(agent.face_encoding)
+        agent.face_encoding_data = HEADER.pack(b'FENC', 1, b'f') + struct.pack(f'<{len(values)}f', *values)
+        agent.save(update_fields=['face_encoding_data'])
+
+
+def binary_to_json(apps, schema_editor):
+    Agent = apps.get_model('agents', 'Agent')
+    for agent in Agent.objects.exclude(face_encoding_data__isnull=True).iterator():
+        blob = bytes(agent.face_encoding_data)
+        if not blob:
+            continue
+        _, _, code = HEADER.unpack_from(blob)
+        item = code.decode()
+        count = (len(blob) - HEADER.size) // struct.calcsize(item)
+        values = struct.unpack_from(f'<{count}{item}', blob, HEADER.size)
+        agent.face_encoding = json.dumps(list(values))
+        agent.save(update_fields=['face_encoding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='face_encoding_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='agent',
+            name='face_encoding',
+        ),
+        migrations.RenameField(
+            model_name='agent',
+            old_name='face_encoding_data',
+            new_name='face_encoding',
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Refuse la migration tant que des agents partagent le même email
+    """
+    Agent = apps.get_model('agents', 'Agent')
+    duplicates = list(
+        Agent.objects.values('email').annotate(total=Count('id')).filter(total__gt=1).values_list('email', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Emails en double, à corriger avant la migration : "
+            + ', '.join(repr(email) for email in duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0002_binary_face_encoding'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='agent',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True, verbose_name='email address'),
+        ),
+    ]
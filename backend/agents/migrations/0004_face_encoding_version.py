@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def legacy_version():
+    """
+    Version des encodages existants, figée : détection HOG, suréchantillonnage
+    des réglages, un seul jitter (seuls paramètres de l'ancien encodage)
+    """
+    return f"hog-u{getattr(settings, 'FACE_DETECTION_UPSAMPLE', 1)}-j1"
+
+
+def tag_existing_encodings(apps, schema_editor):
+    Agent = apps.get_model('agents', 'Agent')
+    Agent.objects.filter(face_encoding__isnull=False).update(face_encoding_version=legacy_version())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0003_unique_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='face_encoding_version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.RunPython(tag_existing_encodings, migrations.RunPython.noop),
+    ]
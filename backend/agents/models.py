@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hashers_by_algorithm, make_password
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+KIOSK_HASHER = 'pbkdf2_sha256_kiosk'
 
 class Agent(AbstractUser):
     ROLE_CHOICES = [
@@ -8,16 +13,59 @@ class Agent(AbstractUser):
         ('admin', 'Administrateur'),
     ]
     
+    # Identifiant de connexion : une seule recherche indexée au login
+    email = models.EmailField(_('email address'), unique=True)
     nom = models.CharField(max_length=100)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='qualité')
     photo = models.ImageField(upload_to='agent_photos/', null=True, blank=True)
-    face_encoding = models.TextField(null=True, blank=True)
+    face_encoding = models.BinaryField(null=True, blank=True)
+    # Modèle et paramètres qui ont produit face_encoding (face_utils.encoding_version)
+    face_encoding_version = models.CharField(max_length=32, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.nom} ({self.role})"
     
+    def password_hasher(self):
+        """
+        Hasher des mots de passe de l'agent (coût réduit pour les comptes kiosque)
+        """
+        kiosk = self.role in getattr(settings, 'KIOSK_ROLES', ())
+        if kiosk and KIOSK_HASHER in get_hashers_by_algorithm():
+            return KIOSK_HASHER
+        return 'default'
+
+    def set_password(self, raw_password):
+        self.password = make_password(raw_password, hasher=self.password_hasher())
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        # Un hash d'un autre hasher (ou d'un autre coût) est converti au passage
+        return check_password(raw_password, self.password, setter, preferred=self.password_hasher())
+
+    def get_face_encoding(self):
+        """
+        Retourne l'encodage de référence sous forme d'array NumPy (ou None)
+        """
+        from face_recognition_app.encoding_codec import unpack_encoding
+        return unpack_encoding(self.face_encoding)
+    
+    def set_face_encoding(self, encoding, version=None):
+        """
+        Enregistre l'encodage de référence au format binaire, avec sa version
+        (par défaut celle des réglages courants)
+        """
+        from face_recognition_app.encoding_codec import pack_encoding
+        from face_recognition_app.face_utils import encoding_version
+        self.face_encoding = pack_encoding(encoding) if encoding is not None else None
+        self.face_encoding_version = (version or encoding_version()) if encoding is not None else ''
+    
     class Meta:
         verbose_name = "Agent"
         verbose_name_plural = "Agents"
\ No newline at end of file
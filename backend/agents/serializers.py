@@ -31,18 +31,12 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
         
         if email and password:
-            try:
-                agent = Agent.objects.get(email=email)
-                user = authenticate(username=agent.username, password=password)
-                if user:
-                    if user.is_active:
-                        data['user'] = user
-                        return data
-                    else:
-                        raise serializers.ValidationError('Compte désactivé.')
-                else:
-                    raise serializers.ValidationError('Identifiants invalides.')
-            except Agent.DoesNotExist:
+            user = authenticate(self.context.get('request'), email=email, password=password)
+            if user is None:
                 raise serializers.ValidationError('Identifiants invalides.')
+            if not user.is_active:
+                raise serializers.ValidationError('Compte désactivé.')
+            data['user'] = user
+            return data
         else:
             raise serializers.ValidationError('Email et mot de passe requis.')
\ No newline at end of file
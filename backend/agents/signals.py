@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_auth_state
+from .models import Agent
+
+# Champs dont dépend la validité des jetons
+AUTH_FIELDS = {'is_active', 'role', 'password'}
+
+
+@receiver(post_save, sender=Agent)
+def revoke_on_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Applique immédiatement une désactivation, un changement de rôle ou de mot de passe
+    """
+    if update_fields is None or AUTH_FIELDS.intersection(update_fields):
+        invalidate_auth_state(instance.id)
+
+
+@receiver(post_delete, sender=Agent)
+def revoke_on_delete(sender, instance, **kwargs):
+    invalidate_auth_state(instance.id)
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import get_auth_state, tokens_for_agent
+from .models import Agent
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        self.agent = Agent.objects.create_user(
+            username='q1', email='q1@example.com', password='pw', nom='Q1', role='qualité'
+        )
+        self.client = APIClient()
+
+    def login(self, email, password):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': password})
+
+    def errors(self, response):
+        return response.json()['non_field_errors']
+
+    def test_login(self):
+        response = self.login('q1@example.com', 'pw')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['id'], self.agent.id)
+
+    def test_inactive_account(self):
+        self.agent.is_active = False
+        self.agent.save()
+        response = self.login('q1@example.com', 'pw')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.errors(response), ['Compte désactivé.'])
+        # Sans le bon mot de passe, l'état du compte n'est pas révélé
+        self.assertEqual(self.errors(self.login('q1@example.com', 'wrong')), ['Identifiants invalides.'])
+
+    def test_unknown_email_hashes_with_default_hasher(self):
+        with mock.patch('agents.backends.make_password', wraps=make_password) as hash_password:
+            response = self.login('nobody@example.com', 'pw')
+        self.assertEqual(self.errors(response), ['Identifiants invalides.'])
+        hash_password.assert_called_once_with('pw', hasher='default')
+
+
+class TokenRevocationTests(TestCase):
+    """
+    Jetons à claims : l'état de révocation (cache) suffit, sans lecture de l'agent
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.agent = Agent.objects.create_user(
+            username='q1', email='q1@example.com', password='pw', nom='Q1', role='qualité'
+        )
+        self.client = APIClient()
+
+    def get(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.get('/api/machines/')
+
+    def assertRevoked(self, response, code):
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], code)
+
+    def test_valid_token_reads_no_agent(self):
+        token = tokens_for_agent(self.agent).access_token
+        get_auth_state(self.agent.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'agents_agent' in query['sql']])
+
+    def test_deactivation(self):
+        token = tokens_for_agent(self.agent).access_token
+        self.assertEqual(self.get(token).status_code, 200)
+        self.agent.is_active = False
+        self.agent.save()
+        self.assertRevoked(self.get(token), 'user_inactive')
+
+    def test_deleted_agent(self):
+        token = tokens_for_agent(self.agent).access_token
+        self.agent.delete()
+        self.assertRevoked(self.get(token), 'user_not_found')
+
+    def test_role_change(self):
+        token = tokens_for_agent(self.agent).access_token
+        self.assertEqual(self.get(token).status_code, 200)
+        self.agent.role = 'maintenance'
+        self.agent.save()
+        self.assertRevoked(self.get(token), 'token_revoked')
+
+    def test_password_change(self):
+        token = tokens_for_agent(self.agent).access_token
+        self.assertEqual(self.get(token).status_code, 200)
+        self.agent.set_password('new')
+        self.agent.save()
+        self.assertRevoked(self.get(token), 'token_revoked')
+
+    def test_kiosk_rehash_revokes_earlier_tokens(self):
+        token = tokens_for_agent(self.agent).access_token
+        self.assertEqual(self.get(token).status_code, 200)
+        # Nouveau coût kiosque : le hash est converti à la connexion suivante
+        with override_settings(KIOSK_PASSWORD_ITERATIONS=1000):
+            response = self.client.post('/api/auth/login/', {'email': 'q1@example.com', 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        self.assertRevoked(self.get(token), 'token_revoked')
+        self.assertEqual(self.get(response.json()['access']).status_code, 200)
+
+    def test_legacy_token_falls_back_to_database(self):
+        # Jeton émis avant les claims : l'agent est relu en base
+        token = RefreshToken.for_user(self.agent).access_token
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(token).status_code, 200)
+        self.assertTrue([query for query in queries if 'agents_agent' in query['sql']])
+        self.agent.is_active = False
+        self.agent.save()
+        self.assertRevoked(self.get(token), 'user_inactive')
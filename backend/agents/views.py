@@ -2,13 +2,15 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from .authentication import tokens_for_agent
+from faceid_factory.pagination import OptInCursorPagination
 from .models import Agent
 from .serializers import AgentSerializer, AgentCreateSerializer, LoginSerializer
 
 class AgentListCreateView(generics.ListCreateAPIView):
     queryset = Agent.objects.all()
+    pagination_class = OptInCursorPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -28,10 +30,10 @@ class AgentDetailView(generics.RetrieveUpdateDestroyAPIView):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
-    serializer = LoginSerializer(data=request.data)
+    serializer = LoginSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_agent(user)
         
         return Response({
             'access': str(refresh.access_token),
@@ -43,5 +45,7 @@ def login_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def profile_view(request):
-    serializer = AgentSerializer(request.user)
+    # request.user ne porte que les claims du jeton : charger l'agent complet
+    agent = Agent.objects.get(pk=request.user.id)
+    serializer = AgentSerializer(agent)
     return Response(serializer.data)
\ No newline at end of file
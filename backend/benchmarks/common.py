@@ -0,0 +1,85 @@
+"""
+Outils partagés par les benchmarks
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def setup_django(fresh_db=True):
+    """
+    Initialise Django avec les réglages de benchmark et migre la base SQLite
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    from django.conf import settings
+
+    if fresh_db and os.path.exists(settings.DATABASES['default']['NAME']):
+        os.remove(settings.DATABASES['default']['NAME'])
+
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def summarize(samples):
+    """
+    Statistiques de latence (en millisecondes) d'une série de mesures en secondes
+    """
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    if values.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(values.size),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'max_ms': float(values.max()),
+    }
+
+
+def timeit(func, repeat):
+    """
+    Exécute func `repeat` fois et retourne les durées en secondes
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_results(path, suite, results):
+    """
+    Écrit les résultats en JSON, avec le commit et l'environnement de mesure
+    """
+    payload = {'suite': suite, 'meta': metadata(), 'results': results}
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"Résultats écrits dans {path}")
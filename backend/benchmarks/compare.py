@@ -0,0 +1,53 @@
+"""
+Compare deux fichiers de résultats de benchmark (p50 et débit)
+
+    python -m benchmarks.compare avant.json apres.json
+"""
+import argparse
+import json
+
+
+def flatten(node, prefix=''):
+    """
+    Extrait les métriques comparables (p50_ms, p95_ms, throughput_rps)
+    d'un arbre de résultats, indexées par leur chemin
+    """
+    metrics = {}
+    if isinstance(node, dict):
+        label = ','.join(
+            f'{key}={node[key]}' for key in ('frame_size', 'gallery_size', 'concurrency') if key in node
+        )
+        if label:
+            prefix = f'{prefix}[{label}]'
+        for key, value in node.items():
+            if key in ('p50_ms', 'p95_ms', 'throughput_rps'):
+                metrics[f'{prefix}.{key}'] = value
+            elif isinstance(value, (dict, list)):
+                metrics.update(flatten(value, f'{prefix}.{key}' if prefix else key))
+    elif isinstance(node, list):
+        for item in node:
+            metrics.update(flatten(item, prefix))
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{(before['meta'].get('commit') or '?')[:10]} -> {(after['meta'].get('commit') or '?')[:10]}")
+    old = flatten(before['results'])
+    new = flatten(after['results'])
+    for name in sorted(old.keys() & new.keys()):
+        change = (new[name] - old[name]) / old[name] * 100 if old[name] else 0.0
+        print(f"{name:<90} {old[name]:>10.3f} {new[name]:>10.3f} {change:>+7.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark de la chaîne de vérification Face ID
+
+    cd backend
+    python -m benchmarks.face_pipeline --output bench_face.json
+
+Mesure, hors ligne sur SQLite et des visages synthétiques :
+- la latence par étape de encode_face_from_base64 pour plusieurs tailles d'image ;
+- compare_faces, compare_faces_gallery et la recherche 1:N selon la taille de galerie ;
+- le débit de bout en bout de verify_face_id selon la concurrence et la taille de galerie.
+"""
+import argparse
+import threading
+import time
+
+from .common import setup_django, summarize, timeit, write_results
+
+FRAME_SIZES = [(640, 480), (1280, 720), (1920, 1080)]
+
+
+def bench_encoding(faces, repeat):
+    from face_recognition_app.face_utils import encode_face_from_base64
+    from face_recognition_app.testing import frame, to_data_url
+
+    results = []
+    for frame_size in FRAME_SIZES:
+        photos = [to_data_url(frame(face, frame_size, seed)) for seed, face in faces]
+        stages = {}
+        totals = []
+        for i in range(repeat):
+            timings = {}
+            start = time.perf_counter()
+            encode_face_from_base64(photos[i % len(photos)], timings)
+            totals.append(time.perf_counter() - start)
+            for stage, duration in timings.items():
+                stages.setdefault(stage, []).append(duration)
+
+        results.append({
+            'frame_size': list(frame_size),
+            'total': summarize(totals),
+            'stages': {stage: summarize(samples) for stage, samples in stages.items()},
+        })
+        print(f"encode {frame_size[0]}x{frame_size[1]}: {results[-1]['total']['p50_ms']:.1f} ms (p50)")
+    return results
+
+
+def bench_compare(gallery_sizes, repeat):
+    import numpy as np
+    from django.core.cache import cache
+    from face_recognition_app.encoding_index import FaceEncodingIndex, GENERATION_CACHE_KEY
+    from face_recognition_app.face_utils import compare_faces, compare_faces_gallery
+    from face_recognition_app.testing import random_encodings
+
+    live = random_encodings(1, seed=1)[0]
+    results = {'compare_faces': summarize(timeit(lambda: compare_faces(live, live), repeat))}
+
+    galleries = []
+    for size in gallery_sizes:
+        encodings = random_encodings(size, seed=size)
+        index = FaceEncodingIndex()
+        index._set_arrays(np.arange(size, dtype=np.int64), encodings)
+        # Index construit en mémoire : la base n'est pas concernée ici
+        index._loaded = True
+        index._generation = cache.get(GENERATION_CACHE_KEY)
+
+        galleries.append({
+            'gallery_size': size,
+            'compare_faces_gallery': summarize(timeit(lambda: compare_faces_gallery(encodings, live), repeat)),
+            'index_search': summarize(timeit(lambda: index.search(live), repeat)),
+        })
+        print(f"galerie {size}: recherche 1:N {galleries[-1]['index_search']['p50_ms']:.3f} ms (p50)")
+
+    results['galleries'] = galleries
+    return results
+
+
+def seed_agents(gallery_size, enrolled_face):
+    """
+    Crée gallery_size agents enrôlés, dont le premier porte le visage de test
+    """
+    from agents.models import Agent
+    from face_recognition_app.encoding_codec import pack_encoding
+    from face_recognition_app.encoding_index import face_index
+    from machines.models import Machine
+    from face_recognition_app.testing import random_encodings
+
+    Agent.objects.all().delete()
+    encodings = random_encodings(gallery_size, seed=gallery_size)
+    encodings[0] = enrolled_face
+    Agent.objects.bulk_create([
+        Agent(
+            username=f'bench{i}', email=f'bench{i}@example.com', nom=f'Bench {i}',
+            role='qualité', password='!', face_encoding=pack_encoding(encoding)
+        )
+        for i, encoding in enumerate(encodings)
+    ], batch_size=1000)
+    face_index.invalidate()
+
+    agent = Agent.objects.get(username='bench0')
+    machine = Machine.objects.get_or_create(nom_machine='Banc de test', localisation='Benchmark')[0]
+    return agent, machine
+
+
+def bench_verify(faces, gallery_sizes, concurrency_levels, requests_per_level):
+    from django.test import Client
+    from face_recognition_app.face_utils import encode_face_from_base64
+    from face_recognition_app.testing import frame, to_data_url, variant
+
+    seed, face = faces[0]
+    enrolled = encode_face_from_base64(to_data_url(frame(face, (1280, 720), seed)))
+    live_photo = to_data_url(variant(frame(face, (1280, 720), seed), seed))
+
+    results = []
+    for gallery_size in gallery_sizes:
+        agent, machine = seed_agents(gallery_size, enrolled)
+        body = {
+            'agent_id': agent.id,
+            'machine_id': machine.id,
+            'problem_type': 'matière',
+            'live_photo': live_photo,
+        }
+        # Démarrage du pool, chargement de l'index et des caches hors mesure
+        Client().post('/api/face-recognition/verify/', body, content_type='application/json')
+
+        for concurrency in concurrency_levels:
+            latencies = []
+            statuses = {}
+            matches = []
+            lock = threading.Lock()
+            per_thread = max(1, requests_per_level // concurrency)
+
+            def worker():
+                client = Client()
+                for _ in range(per_thread):
+                    start = time.perf_counter()
+                    response = client.post('/api/face-recognition/verify/', body, content_type='application/json')
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                        matches.append(bool(response.json().get('is_match')))
+
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - start
+
+            results.append({
+                'gallery_size': gallery_size,
+                'concurrency': concurrency,
+                'requests': len(latencies),
+                'throughput_rps': len(latencies) / wall,
+                'statuses': statuses,
+                'matches': sum(matches),
+                'latency': summarize(latencies),
+            })
+            print(
+                f"verify galerie={gallery_size} concurrence={concurrency}: "
+                f"{results[-1]['throughput_rps']:.2f} req/s, {sum(matches)}/{len(matches)} reconnus"
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_face.json')
+    parser.add_argument('--faces', type=int, default=3, help="Nombre de visages synthétiques")
+    parser.add_argument('--repeat', type=int, default=20, help="Répétitions par mesure d'encodage")
+    parser.add_argument('--compare-repeat', type=int, default=1000)
+    parser.add_argument('--gallery-sizes', default='10,100,1000')
+    parser.add_argument('--concurrency', default='1,2,4')
+    parser.add_argument('--requests', type=int, default=16, help="Requêtes verify par niveau de concurrence")
+    parser.add_argument('--skip-verify', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from face_recognition_app.testing import detectable_faces
+
+    gallery_sizes = [int(size) for size in args.gallery_sizes.split(',')]
+    faces = detectable_faces(args.faces)
+
+    results = {
+        'encode_face_from_base64': bench_encoding(faces, args.repeat),
+        'compare': bench_compare(gallery_sizes, args.compare_repeat),
+    }
+    if not args.skip_verify:
+        results['verify_face_id'] = bench_verify(
+            faces, gallery_sizes,
+            [int(level) for level in args.concurrency.split(',')],
+            args.requests,
+        )
+
+    from face_recognition_app.encoding_pool import get_encoding_pool
+    get_encoding_pool().shutdown()
+
+    write_results(args.output, 'face_pipeline', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark des requêtes sur les interventions, avant / après les index
+
+    cd backend
+    python -m benchmarks.intervention_queries --rows 1000000 --output bench_interventions.json
+
+La base est migrée jusqu'à interventions 0002 (sans index composites), remplie
+de `--rows` interventions réparties sur un an, puis chaque requête est mesurée
+et son plan (EXPLAIN) relevé ; la migration 0003 est ensuite appliquée et les
+mêmes mesures sont refaites.
+"""
+import argparse
+import datetime
+import random
+import time
+
+from .common import setup_django, summarize, timeit, write_results
+
+BEFORE_MIGRATION = '0002_match_distance'
+AFTER_MIGRATION = '0003_intervention_indexes'
+
+
+def seed(rows, agents, machines, seed_value=0):
+    """
+    Insère les agents, machines et interventions par lots (SQL brut, rapide)
+    """
+    from django.db import connection, transaction
+    from django.utils import timezone
+    from agents.models import Agent
+    from interventions.models import Intervention
+    from machines.models import Machine
+
+    rng = random.Random(seed_value)
+    Agent.objects.bulk_create([
+        Agent(username=f'bench{i}', email=f'bench{i}@example.com', nom=f'Bench {i}', role='qualité', password='!')
+        for i in range(agents)
+    ])
+    Machine.objects.bulk_create([
+        Machine(nom_machine=f'Machine {i}', localisation='Benchmark') for i in range(machines)
+    ])
+    agent_ids = list(Agent.objects.values_list('id', flat=True))
+    machine_ids = list(Machine.objects.values_list('id', flat=True))
+
+    table = Intervention._meta.db_table
+    sql = (
+        f'INSERT INTO {table} (machine_id, agent_id, type_probleme, statut, date_blocage, description) '
+        f'VALUES (%s, %s, %s, %s, %s, %s)'
+    )
+    types = [value for value, _ in Intervention.PROBLEM_TYPES]
+    now = timezone.now()
+    year = 365 * 24 * 3600
+
+    batch_size = 20000
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, rows, batch_size):
+            cursor.executemany(sql, [
+                (
+                    rng.choice(machine_ids),
+                    rng.choice(agent_ids),
+                    rng.choice(types),
+                    # Quelques pourcents seulement restent en cours
+                    'en_cours' if rng.random() < 0.03 else 'résolu',
+                    # Même représentation que l'ORM (SQLite : texte UTC sans fuseau)
+                    connection.ops.adapt_datetimefield_value(now - datetime.timedelta(seconds=rng.randrange(year))),
+                    '',
+                )
+                for _ in range(min(batch_size, rows - offset))
+            ])
+
+    return agent_ids, machine_ids
+
+
+def queries(agent_id, machine_id):
+    """
+    Requêtes représentatives : (nom, fonction retournant un queryset évalué)
+    """
+    from django.utils import timezone
+    from interventions.models import Intervention
+
+    week_ago = timezone.now() - datetime.timedelta(days=7)
+    objects = Intervention.objects
+
+    return [
+        ('agent_history', lambda: objects.filter(agent_id=agent_id).order_by('-date_blocage')[:20]),
+        ('machine_open', lambda: objects.filter(machine_id=machine_id, statut='en_cours')),
+        ('dashboard_open', lambda: objects.filter(statut='en_cours').order_by('-date_blocage')[:20]),
+        ('admin_list', lambda: objects.order_by('-date_blocage')[:100]),
+        ('last_week', lambda: objects.filter(date_blocage__gte=week_ago).order_by('-date_blocage')[:100]),
+    ]
+
+
+def measure(agent_id, machine_id, repeat):
+    results = {}
+    for name, build in queries(agent_id, machine_id):
+        queryset = build()
+        plan = queryset.explain()
+        samples = timeit(lambda: list(build()), repeat)
+        results[name] = {'plan': plan, 'latency': summarize(samples)}
+        print(f"  {name:<16} {results[name]['latency']['p50_ms']:>9.2f} ms (p50)  {plan.splitlines()[-1].strip()}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_interventions.json')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--agents', type=int, default=500)
+    parser.add_argument('--machines', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command('migrate', 'interventions', BEFORE_MIGRATION, verbosity=0)
+
+    start = time.perf_counter()
+    agent_ids, machine_ids = seed(args.rows, args.agents, args.machines)
+    print(f"{args.rows} interventions insérées en {time.perf_counter() - start:.1f} s")
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    agent_id, machine_id = agent_ids[0], machine_ids[0]
+
+    print(f"Avant ({BEFORE_MIGRATION}) :")
+    before = measure(agent_id, machine_id, args.repeat)
+
+    start = time.perf_counter()
+    call_command('migrate', 'interventions', AFTER_MIGRATION, verbosity=0)
+    migration_time = time.perf_counter() - start
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    print(f"Après ({AFTER_MIGRATION}, appliquée en {migration_time:.1f} s) :")
+    after = measure(agent_id, machine_id, args.repeat)
+
+    write_results(args.output, 'intervention_queries', {
+        'rows': args.rows,
+        'database': connection.vendor,
+        'migration_seconds': migration_time,
+        'before': before,
+        'after': after,
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark du login (pointe de connexions au changement d'équipe)
+
+    cd backend
+    python -m benchmarks.login --agents 2000 --output bench_login.json
+
+Trois variantes sont mesurées sur les mêmes agents, avec les vrais hashers de
+mots de passe (les réglages de benchmark utilisent MD5 pour le reste) :
+
+- legacy : ancien chemin de LoginSerializer (recherche par email sans index
+  unique, puis authenticate(username=...) qui relit l'agent), hasher par défaut ;
+- email_backend : LoginSerializer actuel (EmailBackend, index unique), hasher
+  par défaut pour tous les comptes ;
+- kiosk : idem avec le hasher des comptes kiosque (KIOSK_ROLES), après une
+  première connexion de chaque agent qui convertit son hash.
+
+Pour chaque variante : requêtes SQL par login, débit et latence selon la
+concurrence.
+"""
+import argparse
+import threading
+import time
+
+from .common import setup_django, summarize, write_results
+
+BEFORE_MIGRATION = '0002_binary_face_encoding'
+AFTER_MIGRATION = '0003_unique_email'
+PASSWORD = 'changement-equipe'
+
+
+def seed(agents):
+    """
+    Crée les agents avec le même mot de passe (un seul hash calculé)
+    """
+    from django.contrib.auth.hashers import make_password
+    from agents.models import Agent
+
+    password = make_password(PASSWORD)
+    Agent.objects.bulk_create([
+        Agent(username=f'bench{i}', email=f'bench{i}@example.com', nom=f'Bench {i}', role='qualité', password=password)
+        for i in range(agents)
+    ], batch_size=1000)
+    return [f'bench{i}@example.com' for i in range(agents)]
+
+
+def legacy_login(email, password):
+    """
+    Reproduction de l'ancien LoginSerializer.validate
+    """
+    from django.contrib.auth import authenticate
+    from agents.models import Agent
+
+    agent = Agent.objects.get(email=email)
+    user = authenticate(username=agent.username, password=password)
+    return user is not None and user.is_active
+
+
+def serializer_login(email, password):
+    from agents.serializers import LoginSerializer
+    return LoginSerializer(data={'email': email, 'password': password}).is_valid()
+
+
+def count_queries(login, email):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        login(email, PASSWORD)
+    return len(context)
+
+
+def measure(login, emails, concurrency_levels, logins):
+    results = []
+    for concurrency in concurrency_levels:
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        per_thread = max(1, logins // concurrency)
+
+        def worker(offset):
+            for i in range(per_thread):
+                email = emails[(offset * per_thread + i) % len(emails)]
+                start = time.perf_counter()
+                ok = login(email, PASSWORD)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    if not ok:
+                        failures.append(email)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        results.append({
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'failures': len(failures),
+            'throughput_rps': len(latencies) / wall,
+            'latency': summarize(latencies),
+        })
+        print(
+            f"  concurrence={concurrency}: {results[-1]['throughput_rps']:.1f} logins/s, "
+            f"p50 {results[-1]['latency']['p50_ms']:.1f} ms, {len(failures)} échecs"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_login.json')
+    parser.add_argument('--agents', type=int, default=2000)
+    parser.add_argument('--logins', type=int, default=50, help="Logins par niveau de concurrence")
+    parser.add_argument('--concurrency', default='1,4')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.management import call_command
+    from django.test import override_settings
+    from faceid_factory import settings as project_settings
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(',')]
+    hashers = override_settings(PASSWORD_HASHERS=project_settings.PASSWORD_HASHERS)
+    hashers.enable()
+
+    call_command('migrate', 'agents', BEFORE_MIGRATION, verbosity=0)
+    emails = seed(args.agents)
+    # Les logins mesurés parcourent ces agents
+    used = emails[:args.logins]
+
+    variants = [
+        ('legacy', BEFORE_MIGRATION, legacy_login, {
+            'KIOSK_ROLES': [],
+            'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+        }),
+        ('email_backend', AFTER_MIGRATION, serializer_login, {'KIOSK_ROLES': []}),
+        ('kiosk', AFTER_MIGRATION, serializer_login, {}),
+    ]
+
+    results = {'agents': args.agents}
+    for name, migration, login, overrides in variants:
+        call_command('migrate', 'agents', migration, verbosity=0)
+        with override_settings(**overrides):
+            if name == 'kiosk':
+                start = time.perf_counter()
+                for email in used:
+                    login(email, PASSWORD)
+                print(f"Conversion de {len(used)} hash kiosque en {time.perf_counter() - start:.1f} s")
+
+            queries = count_queries(login, used[0])
+            print(f"{name} ({migration}, {queries} requêtes par login) :")
+            results[name] = {
+                'migration': migration,
+                'queries_per_login': queries,
+                'logins': measure(login, used, concurrency_levels, args.logins),
+            }
+
+    hashers.disable()
+    write_results(args.output, 'login', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+Réglages des benchmarks : base SQLite locale, hors ligne
+"""
+import os
+import tempfile
+
+from faceid_factory.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'BENCHMARK_DB', os.path.join(tempfile.gettempdir(), 'faceid_factory_bench.sqlite3')
+        ),
+        'OPTIONS': {
+            # Plusieurs threads écrivent des interventions en parallèle
+            'timeout': 30,
+        },
+    }
+}
+
+# Création rapide des agents de test
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+FACE_ENCODING_POOL_SIZE = int(os.environ['BENCHMARK_POOL_SIZE']) if 'BENCHMARK_POOL_SIZE' in os.environ else None
+
+# Chaque requête mesurée envoie la même photo : sans cela, seule la première serait encodée
+FACE_ENCODING_CACHE_MAX_BYTES = 0
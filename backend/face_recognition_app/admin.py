@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import FaceTemplate, VersionedEncoding
+
+@admin.register(FaceTemplate)
+class FaceTemplateAdmin(admin.ModelAdmin):
+    list_display = ['agent', 'source', 'version', 'distance', 'created_at']
+    list_filter = ['source', 'version', 'created_at']
+    search_fields = ['agent__nom', 'agent__username']
+    list_select_related = ['agent']
+
+@admin.register(VersionedEncoding)
+class VersionedEncodingAdmin(admin.ModelAdmin):
+    list_display = ['agent', 'version', 'status', 'created_at']
+    list_filter = ['version', 'status']
+    search_fields = ['agent__nom', 'agent__username']
+    list_select_related = ['agent']
@@ -0,0 +1,103 @@
+"""
+Cache en lecture des agents et machines pour le chemin de vérification
+
+Les entrées sont stockées via le framework de cache de Django (alias
+FACE_CACHE_ALIAS, mémoire locale par défaut ; Redis ou Memcached pour
+partager le cache entre workers) et invalidées par les signaux post_save
+et post_delete.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from agents.models import Agent
+from machines.models import Machine
+from .face_utils import encoding_version
+from .models import FaceTemplate, areference_encoding, build_gallery, load_agent_gallery
+
+AGENT_KEY = 'face_agent:{}'
+MACHINE_KEY = 'face_machine:{}'
+
+
+def _cache():
+    return caches[getattr(settings, 'FACE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'FACE_CACHE_TIMEOUT', 300)
+
+
+def get_agent_entry(agent_id):
+    """
+    Retourne {'id', 'nom', 'role', 'is_active', 'gallery'} pour un agent ;
+    lève Agent.DoesNotExist s'il n'existe pas
+    """
+    key = AGENT_KEY.format(agent_id)
+    entry = _cache().get(key)
+    if entry is None:
+        agent = Agent.objects.only('id', 'nom', 'role', 'is_active', 'face_encoding', 'face_encoding_version').get(id=agent_id)
+        entry = {
+            'id': agent.id,
+            'nom': agent.nom,
+            'role': agent.role,
+            'is_active': agent.is_active,
+            'gallery': load_agent_gallery(agent),
+        }
+        _cache().set(key, entry, _timeout())
+    return entry
+
+
+def get_machine_entry(machine_id):
+    """
+    Retourne {'id', 'nom_machine', 'is_active'} pour une machine ;
+    lève Machine.DoesNotExist si elle n'existe pas
+    """
+    key = MACHINE_KEY.format(machine_id)
+    entry = _cache().get(key)
+    if entry is None:
+        entry = Machine.objects.values('id', 'nom_machine', 'is_active').get(id=machine_id)
+        _cache().set(key, entry, _timeout())
+    return entry
+
+
+async def aget_agent_entry(agent_id):
+    """
+    Version asynchrone de get_agent_entry (cache et ORM asynchrones)
+    """
+    key = AGENT_KEY.format(agent_id)
+    entry = await _cache().aget(key)
+    if entry is None:
+        agent = await Agent.objects.only('id', 'nom', 'role', 'is_active', 'face_encoding', 'face_encoding_version').aget(id=agent_id)
+        version = encoding_version()
+        template_blobs = [
+            blob async for blob in
+            FaceTemplate.objects.filter(agent_id=agent.id, version=version).values_list('encoding', flat=True)
+        ]
+        entry = {
+            'id': agent.id,
+            'nom': agent.nom,
+            'role': agent.role,
+            'is_active': agent.is_active,
+            'gallery': build_gallery(await areference_encoding(agent, version), template_blobs),
+        }
+        await _cache().aset(key, entry, _timeout())
+    return entry
+
+
+async def aget_machine_entry(machine_id):
+    """
+    Version asynchrone de get_machine_entry
+    """
+    key = MACHINE_KEY.format(machine_id)
+    entry = await _cache().aget(key)
+    if entry is None:
+        entry = await Machine.objects.values('id', 'nom_machine', 'is_active').aget(id=machine_id)
+        await _cache().aset(key, entry, _timeout())
+    return entry
+
+
+def invalidate_agent(agent_id):
+    _cache().delete(AGENT_KEY.format(agent_id))
+
+
+def invalidate_machine(machine_id):
+    _cache().delete(MACHINE_KEY.format(machine_id))
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class FaceRecognitionAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'face_recognition_app'
\ No newline at end of file
+    name = 'face_recognition_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
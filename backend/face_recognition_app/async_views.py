@@ -0,0 +1,161 @@
+"""
+Vues asynchrones (servies sous ASGI) de la reconnaissance faciale
+
+Le calcul d'encodage est délégué au pool de processus et attendu sans
+bloquer la boucle d'événements : un seul processus serveur peut ainsi
+garder de nombreuses connexions de bornes ouvertes pendant les encodages.
+"""
+import logging
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+
+from interventions.models import Intervention
+from .agent_cache import aget_agent_entry, aget_machine_entry
+from .encoding_pool import get_encoding_pool
+from .face_utils import encode_face_job, compare_faces_gallery, distance_to_confidence
+from .models import maybe_add_live_template
+from .uploads import UploadTooLarge, django_image_payload
+from .serializers import FaceVerificationSerializer
+from . import metrics
+from .encoding_cache import encoding_cache
+from .views import (
+    agent_refusal, default_outcome, live_cache_key, live_photo_bytes, server_timing, timed,
+    verification_error, verification_result,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def verification_response(result):
+    payload, status_code, headers = result
+    return JsonResponse(payload, status=status_code, headers=headers)
+
+
+def areport_timings(view):
+    """
+    Équivalent asynchrone de views.report_timings
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.face_timings = {}
+        request.face_outcome = None
+        start = time.perf_counter()
+        response = await view(request, *args, **kwargs)
+        metrics.record_request(
+            view.__name__,
+            time.perf_counter() - start,
+            request.face_timings,
+            request.face_outcome or default_outcome(response.status_code)
+        )
+        if request.face_timings:
+            response['Server-Timing'] = server_timing(request.face_timings)
+        return response
+    return wrapper
+
+
+async def aencode_live_photo(request, image):
+    """
+    Équivalent asynchrone de views.encode_live_photo
+    """
+    image = live_photo_bytes(image)
+    if image is None:
+        return None, None
+
+    key = None
+    if encoding_cache.enabled:
+        with timed(request.face_timings, 'cache'):
+            key = live_cache_key(image)
+            # Verrou du cache et hachage SHA-256 hors de la boucle d'événements
+            cached = await sync_to_async(encoding_cache.get)(key)
+        if cached is not None:
+            return cached
+
+    with timed(request.face_timings, 'pool'):
+        encoding, timings, rejection = await get_encoding_pool().arun(encode_face_job, image)
+    request.face_timings.update(timings)
+    if key is not None:
+        await sync_to_async(encoding_cache.set)(key, (encoding, rejection))
+    return encoding, rejection
+
+
+@areport_timings
+async def verify_face_id_async(request):
+    """
+    Vérifie l'identité via Face ID et autorise l'accès à la machine (ASGI)
+    """
+    if request.method != 'POST':
+        return JsonResponse({'detail': 'Méthode non autorisée.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    try:
+        payload = django_image_payload(request, 'live_photo')
+    except ValueError:
+        return JsonResponse({'detail': 'JSON invalide.'}, status=status.HTTP_400_BAD_REQUEST)
+    except UploadTooLarge as e:
+        return JsonResponse({'detail': e.detail}, status=e.status_code)
+
+    serializer = FaceVerificationSerializer(data=payload)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    agent_id = data['agent_id']
+    machine_id = data['machine_id']
+    problem_type = data['problem_type']
+    timings = request.face_timings
+
+    try:
+        with timed(timings, 'lookup'):
+            agent = await aget_agent_entry(agent_id)
+            await aget_machine_entry(machine_id)
+
+        refusal = agent_refusal(request, agent, problem_type)
+        if refusal:
+            return verification_response(refusal)
+
+        live_encoding, rejection = await aencode_live_photo(request, data['live_photo'])
+        if rejection:
+            return verification_response(verification_result(request, rejection))
+        if not live_encoding:
+            return verification_response(verification_result(request, 'no_face'))
+
+        gallery = agent['gallery']
+        if gallery is None:
+            return verification_response(verification_result(request, 'no_reference'))
+
+        is_match, distance = compare_faces_gallery(gallery, live_encoding, timings=timings)
+        confidence = distance_to_confidence(distance)
+
+        if not is_match:
+            return verification_response(verification_result(
+                request, 'mismatch', distance=distance, confidence=confidence
+            ))
+
+        with timed(timings, 'intervention'):
+            intervention = await Intervention.objects.acreate(
+                machine_id=machine_id,
+                agent_id=agent_id,
+                type_probleme=problem_type,
+                statut='résolu',
+                date_deverrouillage=timezone.now(),
+                description=f"Accès autorisé via Face ID pour problème {problem_type}",
+                match_distance=distance,
+                match_confidence=confidence
+            )
+
+        await sync_to_async(maybe_add_live_template)(agent_id, live_encoding, distance)
+
+        return verification_response(verification_result(
+            request, 'success', intervention_id=intervention.id, distance=distance, confidence=confidence
+        ))
+
+    except Exception as e:
+        return verification_response(verification_error(request, e))
+
+
+# Les bornes n'envoient pas de jeton CSRF (comme pour la vue DRF synchrone)
+verify_face_id_async.csrf_exempt = True
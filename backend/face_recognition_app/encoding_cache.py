@@ -0,0 +1,123 @@
+"""
+Cache des encodages calculés, indexé par le contenu de l'image
+
+Les bornes relancent automatiquement une vérification et renvoient parfois
+exactement la même image ; un enrôlement relancé resoumet les mêmes photos.
+Le résultat de l'encodage (y compris « aucun visage » ou un rejet qualité)
+est gardé en mémoire, par processus serveur, sous l'empreinte SHA-256 des
+octets décodés de l'image : une image identique ne repasse ni par la file
+ni par dlib.
+
+Le cache est borné en mémoire (FACE_ENCODING_CACHE_MAX_BYTES, éviction LRU)
+et dans le temps (FACE_ENCODING_CACHE_TIMEOUT).
+"""
+import collections
+import hashlib
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from . import metrics
+
+# Surcoût estimé d'une entrée (clé, tuple, nœud de l'OrderedDict)
+ENTRY_OVERHEAD = 300
+
+
+def image_key(namespace, data):
+    """
+    Clé de cache d'une image : espace de noms (type de travail) + SHA-256 des octets
+    """
+    return f'{namespace}:{hashlib.sha256(data).hexdigest()}'
+
+
+def estimate_size(value):
+    """
+    Taille approximative d'un résultat (listes de floats comprises)
+    """
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class EncodingCache:
+    """
+    Cache LRU à durée de vie, borné en octets et sûr entre threads
+
+    max_bytes : mémoire maximale estimée des entrées (0 = cache désactivé)
+    timeout : durée de vie d'une entrée, en secondes
+    """
+
+    def __init__(self, max_bytes=None, timeout=None):
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'FACE_ENCODING_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+
+    @property
+    def timeout(self):
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'FACE_ENCODING_CACHE_TIMEOUT', 300)
+
+    @property
+    def enabled(self):
+        return bool(self.max_bytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key):
+        """
+        Retourne le résultat mis en cache, ou None (compte les hits et misses)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._discard(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.encoding_cache.inc('hit' if entry is not None else 'miss')
+        return entry[2] if entry is not None else None
+
+    def set(self, key, value):
+        size = estimate_size(value) + len(key) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (expires, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                metrics.encoding_cache_evictions.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+
+encoding_cache = EncodingCache()
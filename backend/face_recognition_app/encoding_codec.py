@@ -0,0 +1,65 @@
+"""
+Format binaire des encodages de visages stockés en base
+
+Un encodage est un blob de 8 octets d'en-tête suivis des valeurs brutes
+en little-endian :
+
+    b'FENC' | version (1 octet) | type ('f' float32, 'd' float64) | 2 octets réservés
+
+L'en-tête fait 8 octets pour que les données restent alignées et puissent
+être lues sans copie avec np.frombuffer.
+"""
+import struct
+
+import numpy as np
+from django.conf import settings
+
+MAGIC = b'FENC'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBc2x')
+
+DTYPE_CODES = {
+    'float32': b'f',
+    'float64': b'd',
+}
+CODE_DTYPES = {
+    b'f': np.dtype('<f4'),
+    b'd': np.dtype('<f8'),
+}
+
+
+class EncodingFormatError(ValueError):
+    pass
+
+
+def pack_encoding(encoding, dtype=None):
+    """
+    Convertit un encodage (liste ou array) en blob binaire versionné
+    """
+    if dtype is None:
+        dtype = getattr(settings, 'FACE_ENCODING_DTYPE', 'float32')
+
+    code = DTYPE_CODES[dtype]
+    values = np.asarray(encoding, dtype=CODE_DTYPES[code]).ravel()
+    return HEADER.pack(MAGIC, FORMAT_VERSION, code) + values.tobytes()
+
+
+def unpack_encoding(blob):
+    """
+    Décode un blob en array NumPy (vue en lecture seule, sans copie)
+    """
+    if blob is None or len(blob) == 0:
+        return None
+
+    if len(blob) < HEADER.size:
+        raise EncodingFormatError("Encodage tronqué")
+
+    magic, version, code = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise EncodingFormatError("Format d'encodage inconnu")
+    if version != FORMAT_VERSION:
+        raise EncodingFormatError(f"Version d'encodage non supportée: {version}")
+    if code not in CODE_DTYPES:
+        raise EncodingFormatError(f"Type d'encodage non supporté: {code!r}")
+
+    return np.frombuffer(blob, dtype=CODE_DTYPES[code], offset=HEADER.size)
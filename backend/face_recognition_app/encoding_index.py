@@ -0,0 +1,202 @@
+"""
+Index en mémoire des encodages de visages pour l'identification 1:N
+"""
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .encoding_codec import unpack_encoding
+
+ENCODING_SIZE = 128
+GENERATION_CACHE_KEY = 'face_encoding_index:generation'
+
+
+class FaceEncodingIndex:
+    """
+    Matrice NumPy de tous les encodages (galeries comprises) des agents actifs.
+
+    La recherche se fait en un seul produit matrice-vecteur : pour chaque
+    encodage connu a et l'encodage live b, ||a - b||² = ||a||² - 2 a·b + ||b||².
+    Chaque ligne porte l'id de son agent ; la distance d'un agent est la
+    distance minimale ou moyenne sur ses lignes (FACE_MATCH_STRATEGY).
+    Les mises à jour reconstruisent les tableaux puis les échangent sous verrou,
+    de sorte qu'une recherche voit toujours un état cohérent.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._generation = None
+        self._set_arrays(
+            np.empty(0, dtype=np.int64),
+            np.empty((0, ENCODING_SIZE), dtype=np.float64),
+        )
+
+    def _set_arrays(self, agent_ids, encodings):
+        self._agent_ids = agent_ids
+        self._encodings = encodings
+        self._squared_norms = np.einsum('ij,ij->i', encodings, encodings)
+        self._unique_ids, self._rows_agent, self._rows_count = np.unique(
+            agent_ids, return_inverse=True, return_counts=True
+        )
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._unique_ids)
+
+    def load(self):
+        """
+        (Re)charge l'index depuis la base de données
+        """
+        from agents.models import Agent
+        from .face_utils import encoding_version
+        from .models import FaceTemplate, VersionedEncoding
+
+        agent_ids = []
+        encodings = []
+        # Génération lue avant les requêtes : une modification concurrente
+        # pendant le chargement provoquera un nouveau chargement
+        generation = cache.get(GENERATION_CACHE_KEY)
+
+        # Encodages de la version courante uniquement : référence principale,
+        # sinon celle préparée ou archivée dans VersionedEncoding
+        version = encoding_version()
+        primaries = (
+            Agent.objects
+            .filter(is_active=True, face_encoding__isnull=False, face_encoding_version=version)
+            .values_list('id', 'face_encoding')
+        )
+        versioned = (
+            VersionedEncoding.objects
+            .filter(version=version, encoding__isnull=False, agent__is_active=True)
+            .exclude(agent__face_encoding_version=version)
+            .values_list('agent_id', 'encoding')
+        )
+        templates = (
+            FaceTemplate.objects
+            .filter(agent__is_active=True, version=version)
+            .values_list('agent_id', 'encoding')
+        )
+        for rows in (primaries, versioned, templates):
+            for agent_id, blob in rows.iterator():
+                encoding = unpack_encoding(blob)
+                if encoding is not None:
+                    agent_ids.append(agent_id)
+                    encodings.append(encoding)
+
+        with self._lock:
+            self._set_arrays(
+                np.array(agent_ids, dtype=np.int64),
+                np.array(encodings, dtype=np.float64).reshape(-1, ENCODING_SIZE),
+            )
+            self._loaded = True
+            self._generation = generation
+
+    def snapshot(self):
+        """
+        Retourne (ids d'agents, encodages) : une ligne par modèle indexé
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return self._agent_ids, self._encodings
+
+    def invalidate(self):
+        """
+        Force un rechargement complet à la prochaine recherche, dans ce
+        processus et dans les autres (ex: après un bulk_update)
+        """
+        with self._lock:
+            self._loaded = False
+            self._bump_generation()
+
+    def _ensure_loaded(self):
+        # Un autre processus a pu modifier l'index : la génération partagée
+        # dans le cache permet de le détecter (backend de cache partagé requis).
+        if not self._loaded or cache.get(GENERATION_CACHE_KEY) != self._generation:
+            self.load()
+
+    def _bump_generation(self):
+        """
+        Incrémente la génération partagée après une modification locale
+
+        Si un autre processus l'a incrémentée depuis le dernier chargement,
+        les tableaux locaux n'ont pas sa modification : rechargement complet.
+        """
+        previous = self._generation
+        try:
+            generation = cache.incr(GENERATION_CACHE_KEY)
+        except ValueError:
+            if cache.add(GENERATION_CACHE_KEY, 1, timeout=None):
+                generation = 1
+            else:
+                generation = cache.incr(GENERATION_CACHE_KEY)
+        if generation != (previous or 0) + 1:
+            self._loaded = False
+        self._generation = generation
+
+    def update_agent(self, agent_id, gallery):
+        """
+        Remplace la galerie d'un agent (matrice k x 128, ou None pour le retirer)
+        """
+        if gallery is None:
+            self.remove_agent(agent_id)
+            return
+
+        gallery = np.asarray(gallery, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+        with self._lock:
+            if self._loaded:
+                keep = self._agent_ids != agent_id
+                self._set_arrays(
+                    np.concatenate([self._agent_ids[keep], np.full(len(gallery), agent_id)]),
+                    np.concatenate([self._encodings[keep], gallery]),
+                )
+            self._bump_generation()
+
+    def remove_agent(self, agent_id):
+        """
+        Retire les encodages d'un agent de l'index
+        """
+        with self._lock:
+            if self._loaded:
+                keep = self._agent_ids != agent_id
+                if keep.all():
+                    return
+                self._set_arrays(self._agent_ids[keep], self._encodings[keep])
+            self._bump_generation()
+
+    def search(self, encoding, strategy=None):
+        """
+        Retourne (agent_id, distance) de l'agent le plus proche,
+        ou (None, None) si l'index est vide
+        """
+        if strategy is None:
+            strategy = getattr(settings, 'FACE_MATCH_STRATEGY', 'min')
+
+        self._ensure_loaded()
+        with self._lock:
+            agent_ids = self._agent_ids
+            encodings = self._encodings
+            squared_norms = self._squared_norms
+            unique_ids = self._unique_ids
+            rows_agent = self._rows_agent
+            rows_count = self._rows_count
+
+        if len(agent_ids) == 0:
+            return None, None
+
+        encoding = np.asarray(encoding, dtype=np.float64)
+        squared = squared_norms - 2.0 * (encodings @ encoding) + encoding @ encoding
+
+        if strategy == 'mean':
+            distances = np.sqrt(np.maximum(squared, 0.0))
+            per_agent = np.bincount(rows_agent, weights=distances) / rows_count
+            best = int(np.argmin(per_agent))
+            return int(unique_ids[best]), float(per_agent[best])
+
+        best = int(np.argmin(squared))
+        return int(agent_ids[best]), float(np.sqrt(max(squared[best], 0.0)))
+
+
+face_index = FaceEncodingIndex()
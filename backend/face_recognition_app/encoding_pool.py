@@ -0,0 +1,244 @@
+"""
+Pool de processus dédié à l'encodage des visages
+
+La détection HOG et l'embedding ResNet de dlib sont coûteux en CPU : ils
+sont exécutés dans des processus séparés pour ne pas bloquer les workers
+HTTP et pour répartir la charge sur tous les cœurs. La file d'attente est
+bornée : au-delà, les nouvelles demandes sont refusées immédiatement
+(EncodingQueueFull) plutôt que d'attendre indéfiniment.
+"""
+import asyncio
+import collections
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+from .encoding_cache import image_key
+from .face_utils import encoding_version, warm_up
+
+
+class EncodingQueueFull(Exception):
+    pass
+
+
+class EncodingTimeout(Exception):
+    pass
+
+
+def default_pool_size():
+    """
+    Nombre de processus par défaut : les cœurs répartis entre les workers
+    HTTP du serveur (WEB_CONCURRENCY, convention gunicorn et uvicorn),
+    chacun créant son propre pool ; au moins 1
+    """
+    try:
+        workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    except ValueError:
+        workers = 1
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+
+class EncodingPool:
+    """
+    Pool borné de processus d'encodage.
+
+    size : nombre de processus (0 = exécution directe dans le thread appelant,
+    None = FACE_ENCODING_POOL_SIZE puis default_pool_size())
+    queue_size : nombre de travaux pouvant attendre en plus de ceux en cours
+    timeout : délai maximal d'attente d'un résultat, en secondes
+    """
+
+    def __init__(self, size=None, queue_size=None, timeout=None):
+        if size is None:
+            size = getattr(settings, 'FACE_ENCODING_POOL_SIZE', None)
+        if size is None:
+            size = default_pool_size()
+        if queue_size is None:
+            queue_size = getattr(settings, 'FACE_ENCODING_QUEUE_SIZE', 32)
+        if timeout is None:
+            timeout = getattr(settings, 'FACE_ENCODING_TIMEOUT', 10)
+
+        self.size = size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(size, 1) + queue_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.size,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        # Chaque processus charge les modèles dès son démarrage
+                        initializer=warm_up if getattr(settings, 'FACE_WARMUP', True) else None,
+                    )
+        return self._executor
+
+    def submit(self, func, *args, block=False):
+        """
+        Soumet un travail et retourne un Future ; lève EncodingQueueFull
+        si la file est pleine (après au plus `timeout` secondes si block=True)
+        """
+        acquired = (
+            self._slots.acquire(timeout=self.timeout) if block
+            else self._slots.acquire(blocking=False)
+        )
+        if not acquired:
+            raise EncodingQueueFull("File d'encodage pleine")
+
+        if self.size == 0:
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._slots.release()
+            return future
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, func, *args, timeout=None):
+        """
+        Exécute un travail dans le pool et attend son résultat
+        """
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout=timeout if timeout is not None else self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise EncodingTimeout("Délai d'encodage dépassé")
+
+    async def arun(self, func, *args, timeout=None):
+        """
+        Équivalent asynchrone de run : attend le résultat sans bloquer la
+        boucle d'événements
+        """
+        future = self.submit(func, *args)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout if timeout is not None else self.timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise EncodingTimeout("Délai d'encodage dépassé")
+
+    def map(self, func, items, timeout=None, cache=None):
+        """
+        Exécute func sur chaque élément, avec au plus `size` travaux en vol
+        pour laisser de la place aux demandes interactives
+        
+        Avec un cache (EncodingCache), les éléments en octets déjà traités
+        par func avec la même version d'encodage sont servis sans passer
+        par le pool.
+        Génère (élément, résultat, erreur) dans l'ordre des éléments.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        pending = collections.deque()
+        use_cache = cache is not None and cache.enabled
+        # Un changement de version ne reprend jamais un résultat de l'ancienne
+        namespace = f'{func.__name__}:{encoding_version()}' if use_cache else None
+
+        def collect(item, future):
+            if isinstance(future, Exception):
+                return item, None, future
+            try:
+                return item, future.result(timeout=timeout), None
+            except FutureTimeoutError:
+                future.cancel()
+                return item, None, EncodingTimeout("Délai d'encodage dépassé")
+            except Exception as e:
+                return item, None, e
+
+        def store(key):
+            def callback(future):
+                if not future.cancelled() and future.exception() is None:
+                    cache.set(key, future.result())
+            return callback
+
+        for item in items:
+            if len(pending) >= max(1, self.size):
+                yield collect(*pending.popleft())
+
+            key = None
+            if use_cache and isinstance(item, bytes):
+                key = image_key(namespace, item)
+                result = cache.get(key)
+                if result is not None:
+                    future = Future()
+                    future.set_result(result)
+                    pending.append((item, future))
+                    continue
+
+            try:
+                future = self.submit(func, item, block=True)
+            except EncodingQueueFull as e:
+                pending.append((item, e))
+                continue
+            if key is not None:
+                future.add_done_callback(store(key))
+            pending.append((item, future))
+
+        while pending:
+            yield collect(*pending.popleft())
+
+    def warm_up(self):
+        """
+        Démarre les processus d'encodage sans attendre la première requête
+        (size=0 : charge les modèles dans le processus courant)
+        """
+        if self.size == 0:
+            warm_up()
+            return
+        executor = self._get_executor()
+        # Les processus sont lancés à la première soumission
+        for _ in range(self.size):
+            executor.submit(os.getpid)
+
+    def shutdown(self, wait=True):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_encoding_pool():
+    """
+    Retourne le pool d'encodage du processus courant (créé à la demande)
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = EncodingPool()
+    return _pool
+
+
+def warm_up_encoding():
+    """
+    À appeler au démarrage d'un worker de service (wsgi.py, asgi.py) :
+    précharge les modèles en arrière-plan si FACE_WARMUP est activé
+
+    Les commandes de gestion n'importent pas ces modules et ne chargent
+    donc jamais dlib.
+    """
+    if not getattr(settings, 'FACE_WARMUP', True):
+        return
+    threading.Thread(target=get_encoding_pool().warm_up, name='face-warm-up', daemon=True).start()
@@ -0,0 +1,204 @@
+"""
+Enrôlement en masse des visages de référence, réencodage et bascule de version
+"""
+import functools
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from agents.models import Agent
+from .agent_cache import invalidate_agent
+from .encoding_cache import encoding_cache
+from .encoding_index import face_index
+from .encoding_codec import pack_encoding
+from .face_utils import encoding_version, enroll_face_job, ENROLLMENT_SUCCESS
+from .models import VersionedEncoding
+
+logger = logging.getLogger(__name__)
+
+ENROLLMENT_UNKNOWN_AGENT = 'unknown_agent'
+ENROLLMENT_ERROR = 'error'
+
+
+def enroll_agents(entries, pool, batch_size=500, dry_run=False):
+    """
+    Encode en parallèle les photos de référence et les enregistre par lots
+
+    entries : liste de (clé, agent ou None, image) où image est un chemin,
+    des octets ou une fonction retournant les octets (lecture à la demande,
+    au plus un lot de travaux en mémoire). Une photo au contenu déjà encodé
+    par ce processus est reprise du cache. Retourne un rapport par entrée :
+    {'key', 'agent_id', 'status', 'error'}
+    """
+    report = []
+    to_encode = []
+    for key, agent, image in entries:
+        entry = {'key': key, 'agent_id': agent.id if agent else None}
+        if agent is None:
+            entry['status'] = ENROLLMENT_UNKNOWN_AGENT
+        else:
+            to_encode.append((entry, agent, image))
+        report.append(entry)
+
+    pending = []
+    images = (image() if callable(image) else image for _, _, image in to_encode)
+    for (entry, agent, _), (_, result, error) in zip(to_encode, pool.map(enroll_face_job, images, cache=encoding_cache)):
+        if error is not None:
+            entry.update(status=ENROLLMENT_ERROR, error=str(error))
+        else:
+            entry['status'], encoding = result
+            if entry['status'] == ENROLLMENT_SUCCESS:
+                agent.set_face_encoding(encoding)
+                agent.updated_at = timezone.now()
+                pending.append(agent)
+
+        if len(pending) >= batch_size:
+            _save(pending, dry_run)
+            pending = []
+
+    _save(pending, dry_run)
+    return report
+
+
+def _save(agents, dry_run):
+    if not agents or dry_run:
+        return
+    Agent.objects.bulk_update(agents, ['face_encoding', 'face_encoding_version', 'updated_at'])
+    # bulk_update n'envoie pas de signal post_save : cache des agents et index
+    for agent in agents:
+        invalidate_agent(agent.id)
+    face_index.invalidate()
+
+
+def read_photo(agent):
+    """
+    Octets de la photo de référence de l'agent (b'' si le fichier manque :
+    l'encodage échoue alors avec le statut invalid_image)
+    """
+    try:
+        with agent.photo.open('rb') as photo:
+            return photo.read()
+    except (OSError, ValueError) as e:
+        logger.warning("Photo illisible pour l'agent %s: %s", agent.id, e)
+        return b''
+
+
+def reencode_agents(agents, pool, params, batch_size=100, on_batch=None):
+    """
+    Réencode en parallèle les photos de référence (Agent.photo) d'une liste
+    d'agents avec les paramètres `params` et enregistre le résultat dans
+    VersionedEncoding
+
+    Les encodages en service ne sont pas modifiés (voir cutover). Chaque lot
+    est enregistré dans sa propre transaction et sert de point de reprise :
+    une exécution interrompue ne perd que le lot en cours. Les photos sont
+    lues à la demande, au plus un lot de travaux en mémoire.
+    on_batch(nombre d'agents traités) est appelé après chaque lot.
+    Retourne un rapport par agent : {'key', 'agent_id', 'status', 'error'}
+    """
+    version = encoding_version(params)
+    job = functools.partial(enroll_face_job, params=params)
+    report = []
+    pending = []
+    images = (read_photo(agent) for agent in agents)
+    for agent, (_, result, error) in zip(agents, pool.map(job, images)):
+        entry = {'key': agent.username, 'agent_id': agent.id}
+        encoding = None
+        if error is not None:
+            entry.update(status=ENROLLMENT_ERROR, error=str(error))
+        else:
+            entry['status'], encoding = result
+        report.append(entry)
+
+        # Une erreur du pool (délai, file pleine) n'est pas enregistrée :
+        # l'agent sera repris à la prochaine exécution
+        if entry['status'] != ENROLLMENT_ERROR:
+            pending.append(VersionedEncoding(
+                agent_id=agent.id,
+                version=version,
+                encoding=pack_encoding(encoding) if encoding is not None else None,
+                status=entry['status'],
+            ))
+        if len(report) % batch_size == 0:
+            _save_versioned(pending, version)
+            pending = []
+            if on_batch:
+                on_batch(len(report))
+
+    if len(report) % batch_size:
+        _save_versioned(pending, version)
+        if on_batch:
+            on_batch(len(report))
+    return report
+
+
+def _save_versioned(rows, version):
+    if not rows:
+        return
+    with transaction.atomic():
+        # Nouvel essai après un échec : remplace le résultat précédent
+        VersionedEncoding.objects.filter(version=version, agent_id__in=[row.agent_id for row in rows]).delete()
+        VersionedEncoding.objects.bulk_create(rows)
+    # La galerie de la version courante peut en dépendre
+    for row in rows:
+        invalidate_agent(row.agent_id)
+
+
+def cutover(version, batch_size=500):
+    """
+    Fait de `version` la référence principale (Agent.face_encoding) des agents
+    réencodés dans cette version
+
+    L'encodage remplacé est archivé dans VersionedEncoding sous son ancienne
+    version : revenir aux anciens réglages reste possible, et la bascule peut
+    précéder ou suivre le déploiement des nouveaux réglages. Chaque lot est
+    enregistré dans sa propre transaction ; une bascule interrompue se
+    reprend en la relançant.
+    Retourne (agents basculés, agents encodés restés dans une autre version)
+    """
+    switched = 0
+    while True:
+        staged = list(
+            VersionedEncoding.objects
+            .filter(version=version, encoding__isnull=False)
+            .select_related('agent')
+            .order_by('agent_id')[:batch_size]
+        )
+        if not staged:
+            break
+
+        archived = []
+        agents = []
+        for row in staged:
+            agent = row.agent
+            if agent.face_encoding_version == version:
+                # Réenrôlé entre-temps dans cette version : la référence est plus récente
+                continue
+            if agent.face_encoding is not None and agent.face_encoding_version:
+                archived.append(VersionedEncoding(
+                    agent_id=agent.id,
+                    version=agent.face_encoding_version,
+                    encoding=agent.face_encoding,
+                    status=ENROLLMENT_SUCCESS,
+                ))
+            agent.face_encoding = row.encoding
+            agent.face_encoding_version = version
+            agent.updated_at = timezone.now()
+            agents.append(agent)
+
+        with transaction.atomic():
+            for row in archived:
+                VersionedEncoding.objects.filter(agent_id=row.agent_id, version=row.version).delete()
+            VersionedEncoding.objects.bulk_create(archived)
+            Agent.objects.bulk_update(agents, ['face_encoding', 'face_encoding_version', 'updated_at'])
+            VersionedEncoding.objects.filter(id__in=[row.id for row in staged]).delete()
+
+        for agent in agents:
+            invalidate_agent(agent.id)
+        switched += len(agents)
+
+    # bulk_update n'envoie pas de signal post_save
+    face_index.invalidate()
+    remaining = Agent.objects.filter(face_encoding__isnull=False).exclude(face_encoding_version=version).count()
+    return switched, remaining
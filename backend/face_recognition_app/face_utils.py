@@ -1,83 +1,462 @@
-import face_recognition
 import numpy as np
-import cv2
-from PIL import Image
 import base64
-import io
+import logging
+import threading
+import time
 from django.conf import settings
 import os
+from . import quality
 
-def encode_face_from_image(image_path):
+# face_recognition (chargement des modèles dlib : plusieurs secondes), cv2 et
+# PIL sont importés au premier usage : les commandes de gestion et les
+# processus qui n'encodent pas de visage ne les chargent jamais.
+
+logger = logging.getLogger(__name__)
+
+def _record_timing(timings, step, start):
     """
-    Encode un visage à partir d'une image
+    Enregistre la durée (en secondes) d'une étape si un dict de mesures est
+    fourni ; une étape répétée (plusieurs images d'une rafale) est cumulée
     """
-    try:
-        # Charger l'image
-        image = face_recognition.load_image_file(image_path)
+    if timings is not None:
+        timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+
+def encoding_params(detection_model=None, upsample=None, jitters=None):
+    """
+    Paramètres dont dépendent les encodages : modèle de détection ('hog' ou
+    'cnn'), suréchantillonnages de la détection et jitters de l'embedding
+    
+    Par défaut : FACE_DETECTION_MODEL, FACE_DETECTION_UPSAMPLE, FACE_ENCODING_JITTERS
+    """
+    return {
+        'detection_model': detection_model or getattr(settings, 'FACE_DETECTION_MODEL', 'hog'),
+        'upsample': upsample if upsample is not None else getattr(settings, 'FACE_DETECTION_UPSAMPLE', 1),
+        'jitters': jitters if jitters is not None else getattr(settings, 'FACE_ENCODING_JITTERS', 1),
+    }
+
+def encoding_version(params=None):
+    """
+    Version des encodages produits avec ces paramètres (par défaut ceux des
+    réglages), ex: 'hog-u1-j1'
+    
+    Un encodage live n'est comparé qu'aux références de la même version.
+    """
+    return '{detection_model}-u{upsample}-j{jitters}'.format(**(params or encoding_params()))
+
+def prepare_image(image, timings=None):
+    """
+    Normalise une image (PIL ou array RGB) : orientation EXIF, conversion
+    RGB et version réduite pour la détection
+    
+    Retourne (array RGB pleine résolution, array de détection, facteur d'échelle)
+    """
+    import cv2
+    
+    start = time.perf_counter()
+    
+    if not isinstance(image, np.ndarray):
+        from PIL import ImageOps
         
-        # Trouver les encodages des visages
-        face_encodings = face_recognition.face_encodings(image)
+        # Les tablettes enregistrent souvent la rotation dans l'EXIF
+        image = ImageOps.exif_transpose(image)
         
-        if len(face_encodings) > 0:
-            # Retourner le premier encodage trouvé
-            return face_encodings[0].tolist()
-        else:
+        # RGBA, niveaux de gris, palette... dlib attend du RGB 8 bits
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image = np.asarray(image)
+    
+    height, width = image.shape[:2]
+    max_side = getattr(settings, 'FACE_DETECTION_MAX_SIDE', 640)
+    scale = 1.0
+    detection_image = image
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        detection_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        detection_image = cv2.resize(image, detection_size, interpolation=cv2.INTER_AREA)
+    
+    _record_timing(timings, 'preprocess', start)
+    return image, detection_image, scale
+
+def encode_largest_face(image, timings=None, report=None, quality_checks=False, params=None):
+    """
+    Détecte les visages sur l'image réduite puis encode uniquement le plus
+    grand, recadré dans l'image pleine résolution
+    
+    Si un dict report est fourni, il reçoit le nombre de visages détectés et,
+    avec quality_checks, le motif de rejet de la capture ('rejection')
+    avant tout calcul d'embedding. params (encoding_params) : paramètres
+    de détection et d'embedding, ceux des réglages par défaut.
+    """
+    import face_recognition
+    
+    params = params or encoding_params()
+    image, detection_array, scale = prepare_image(image, timings)
+    
+    if quality_checks:
+        start = time.perf_counter()
+        gray = quality.to_gray(detection_array)
+        rejection = quality.check_exposure(gray)
+        _record_timing(timings, 'quality', start)
+        if rejection:
+            if report is not None:
+                report['rejection'] = rejection
             return None
+    
+    start = time.perf_counter()
+    face_locations = face_recognition.face_locations(
+        detection_array,
+        number_of_times_to_upsample=params['upsample'],
+        model=params['detection_model']
+    )
+    _record_timing(timings, 'detection', start)
+    
+    if report is not None:
+        report['face_count'] = len(face_locations)
+    
+    if not face_locations:
+        return None
+    
+    if quality_checks:
+        start = time.perf_counter()
+        rejection = quality.check_faces(gray, face_locations, scale)
+        _record_timing(timings, 'quality', start)
+        if rejection:
+            if report is not None:
+                report['rejection'] = rejection
+            return None
+    
+    start = time.perf_counter()
+    top, right, bottom, left = max(
+        face_locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3])
+    )
+    
+    # Ramener la boîte à l'échelle de l'image d'origine
+    top, right, bottom, left = (
+        int(top / scale), int(right / scale), int(bottom / scale), int(left / scale)
+    )
+    
+    # Recadrer autour du visage avec une marge pour les points de repère
+    margin = int(max(bottom - top, right - left) * 0.25)
+    crop_left = max(0, left - margin)
+    crop_top = max(0, top - margin)
+    crop = image[crop_top:bottom + margin, crop_left:right + margin]
+    
+    face_encodings = face_recognition.face_encodings(
+        np.ascontiguousarray(crop),
+        known_face_locations=[(top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)],
+        num_jitters=params['jitters']
+    )
+    _record_timing(timings, 'embedding', start)
+    
+    if len(face_encodings) > 0:
+        return face_encodings[0].tolist()
+    return None
+
+def decode_base64_image(base64_image):
+    """
+    Décode une image base64 (data URL ou base64 brut) en octets
+    """
+    if ',' in base64_image:
+        base64_image = base64_image.split(',', 1)[1]
+    return base64.b64decode(base64_image)
+
+def decode_image_bytes(data):
+    """
+    Décode une image (JPEG, PNG...) directement depuis un buffer d'octets
+    en array RGB, sans copie intermédiaire (orientation EXIF appliquée)
+    """
+    import cv2
+    
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Image illisible")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+def decode_gray_preview(data):
+    """
+    Décode une image en niveaux de gris, réduite au côté de l'image de
+    détection (FACE_DETECTION_MAX_SIDE) : de quoi noter une capture sans la
+    décoder en couleur ni lancer la détection
+    
+    Lève ValueError si les octets sont vides ou illisibles.
+    """
+    import cv2
+    
+    if not data:
+        raise ValueError("Image vide")
+    try:
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    except cv2.error as e:
+        raise ValueError(f"Image illisible: {e}") from e
+    if gray is None:
+        raise ValueError("Image illisible")
+    height, width = gray.shape
+    max_side = getattr(settings, 'FACE_DETECTION_MAX_SIDE', 640)
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return gray
+
+def encode_face_from_image(image_path, timings=None, report=None, quality_checks=False, params=None):
+    """
+    Encode un visage à partir d'une image (chemin, fichier ou octets)
+    """
+    try:
+        # Charger l'image
+        start = time.perf_counter()
+        if isinstance(image_path, (bytes, bytearray, memoryview)):
+            image = decode_image_bytes(image_path)
+        else:
+            from PIL import Image
+            image = Image.open(image_path)
+            image.load()
+        _record_timing(timings, 'decode_image', start)
+        
+        return encode_largest_face(image, timings, report, quality_checks, params)
     except Exception as e:
-        print(f"Erreur lors de l'encodage du visage: {e}")
+        logger.warning("Erreur lors de l'encodage du visage: %s", e)
         return None
 
-def encode_face_from_base64(base64_image):
+def encode_face_from_base64(base64_image, timings=None, report=None, quality_checks=False):
     """
     Encode un visage à partir d'une image en base64
     """
     try:
         # Décoder l'image base64
-        image_data = base64.b64decode(base64_image.split(',')[1])
-        image = Image.open(io.BytesIO(image_data))
+        start = time.perf_counter()
+        image_data = decode_base64_image(base64_image)
+        _record_timing(timings, 'decode_base64', start)
+    except Exception as e:
+        logger.warning("Erreur lors de l'encodage du visage depuis base64: %s", e)
+        return None
+    
+    return encode_face_from_image(image_data, timings, report, quality_checks)
+
+def encode_face_job(image):
+    """
+    Point d'entrée du pool d'encodage : image en base64 (str) ou en octets
+    
+    Retourne (encodage, durées par étape, motif de rejet de la capture ou None)
+    """
+    timings = {}
+    report = {}
+    encode = encode_face_from_base64 if isinstance(image, str) else encode_face_from_image
+    encoding = encode(image, timings, report, quality_checks=quality.quality_checks_enabled())
+    return encoding, timings, report.get('rejection')
+
+# Résultats par image d'une rafale (en plus des motifs de rejet de quality)
+FRAME_MATCH = 'match'
+FRAME_MISMATCH = 'mismatch'
+FRAME_NO_FACE = 'no_face'
+FRAME_INVALID = 'invalid_image'
+FRAME_SKIPPED = 'skipped'
+
+def verify_burst_job(frames, gallery):
+    """
+    Point d'entrée du pool pour une rafale : vérifie plusieurs captures
+    d'un même passage devant la borne contre la galerie de l'agent
+    
+    Chaque capture est d'abord notée à bas coût (exposition et netteté sur
+    une version réduite en niveaux de gris, quelques millisecondes). Les
+    captures retenues sont ensuite détectées et encodées de la plus nette à
+    la moins nette (contrôle qualité complet : taille, nombre de visages,
+    flou), jusqu'à la première qui correspond à la galerie : les suivantes
+    ne coûtent ni détection ni embedding.
+    
+    Retourne un dict : 'frame' (index de la capture reconnue ou None),
+    'encoding' et 'distance' (capture reconnue, sinon la plus proche),
+    'rejection' (motif de la meilleure capture si aucune n'a pu être
+    encodée), 'frames' (résultat par capture), 'work' (captures notées,
+    détectées, encodées) et 'timings'.
+    """
+    timings = {}
+    checks = quality.quality_checks_enabled()
+    results = [{'index': index, 'sharpness': None, 'result': FRAME_SKIPPED, 'distance': None}
+               for index in range(len(frames))]
+    
+    # Notation de toutes les captures
+    candidates = []
+    for entry, frame in zip(results, frames):
+        start = time.perf_counter()
+        try:
+            data = decode_base64_image(frame) if isinstance(frame, str) else frame
+            gray = decode_gray_preview(data)
+        except ValueError as e:
+            logger.warning("Capture %s illisible: %s", entry['index'], e)
+            entry['result'] = FRAME_INVALID
+            continue
+        finally:
+            _record_timing(timings, 'score', start)
+        entry['sharpness'] = quality.frame_sharpness(gray)
+        rejection = quality.check_exposure(gray) if checks else None
+        if rejection:
+            entry['result'] = rejection
+        else:
+            candidates.append((entry, data))
+    
+    candidates.sort(key=lambda candidate: candidate[0]['sharpness'], reverse=True)
+    work = {'frames': len(frames), 'detected': 0, 'encoded': 0}
+    best = {'frame': None, 'encoding': None, 'distance': None}
+    
+    for entry, data in candidates:
+        report = {}
+        encoding = encode_face_from_image(data, timings, report, checks)
+        if 'face_count' in report:
+            work['detected'] += 1
+        if encoding is None:
+            entry['result'] = report.get('rejection') or (FRAME_NO_FACE if 'face_count' in report else FRAME_INVALID)
+            continue
         
-        # Convertir en array numpy
-        image_array = np.array(image)
+        work['encoded'] += 1
+        is_match, distance = compare_faces_gallery(gallery, encoding, timings=timings)
+        entry['distance'] = distance
+        entry['result'] = FRAME_MATCH if is_match else FRAME_MISMATCH
+        if distance is not None and (best['distance'] is None or distance < best['distance']):
+            best = {'frame': entry['index'] if is_match else None, 'encoding': encoding, 'distance': distance}
+        if is_match:
+            break
+    
+    # Aucune capture encodée : motif de rejet de la plus nette, à afficher par la borne
+    rejection = None
+    scored = [entry for entry in results if entry['sharpness'] is not None]
+    if work['encoded'] == 0 and scored:
+        sharpest = max(scored, key=lambda entry: entry['sharpness'])['result']
+        rejection = sharpest if sharpest in quality.REJECTION_MESSAGES else None
+    
+    return dict(best, rejection=rejection, frames=results, work=work, timings=timings)
+
+# Statuts d'enrôlement
+ENROLLMENT_SUCCESS = 'success'
+ENROLLMENT_NO_FACE = 'no_face'
+ENROLLMENT_MULTIPLE_FACES = 'multiple_faces'
+ENROLLMENT_INVALID_IMAGE = 'invalid_image'
+
+def enroll_face_job(image_file, params=None):
+    """
+    Point d'entrée du pool pour l'enrôlement : retourne (statut, encodage)
+    
+    Une photo de référence doit contenir exactement un visage. params :
+    paramètres d'encodage d'une autre version (réencodage), sinon ceux des
+    réglages.
+    """
+    report = {}
+    encoding = encode_face_from_image(image_file, report=report, params=params)
+    face_count = report.get('face_count')
+    
+    if face_count is None:
+        return ENROLLMENT_INVALID_IMAGE, None
+    if face_count == 0:
+        return ENROLLMENT_NO_FACE, None
+    if face_count > 1:
+        return ENROLLMENT_MULTIPLE_FACES, None
+    if encoding is None:
+        return ENROLLMENT_NO_FACE, None
+    return ENROLLMENT_SUCCESS, encoding
+
+def distance_to_confidence(distance, tolerance=None):
+    """
+    Convertit une distance en indice de confiance entre 0 et 1
+    (1 = visages identiques, 0.5 = exactement au seuil de tolérance)
+    """
+    if distance is None:
+        return None
+    if tolerance is None:
+        tolerance = getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6)
+    return float(min(1.0, max(0.0, 1.0 - distance / (2 * tolerance))))
+
+def compare_faces(known_encoding, unknown_encoding, tolerance=None, timings=None):
+    """
+    Compare deux encodages de visages
+    
+    Retourne (correspondance, distance euclidienne)
+    """
+    if tolerance is None:
+        tolerance = getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6)
+    
+    start = time.perf_counter()
+    try:
+        # Convertir en arrays numpy (sans copie si c'en est déjà)
+        known_encoding = np.asarray(known_encoding)
+        unknown_encoding = np.asarray(unknown_encoding)
         
-        # Trouver les encodages des visages
-        face_encodings = face_recognition.face_encodings(image_array)
+        # Calculer la distance une seule fois
+        distance = float(np.linalg.norm(known_encoding - unknown_encoding))
+        _record_timing(timings, 'compare', start)
         
-        if len(face_encodings) > 0:
-            return face_encodings[0].tolist()
-        else:
-            return None
+        return distance <= tolerance, distance
     except Exception as e:
-        print(f"Erreur lors de l'encodage du visage depuis base64: {e}")
-        return None
+        logger.exception("Erreur lors de la comparaison des visages: %s", e)
+        return False, None
 
-def compare_faces(known_encoding, unknown_encoding, tolerance=None):
+def compare_faces_gallery(known_encodings, unknown_encoding, tolerance=None, strategy=None, timings=None):
     """
-    Compare deux encodages de visages
+    Compare un encodage à tous les modèles d'un agent en une seule opération
+    
+    Retourne (correspondance, distance) où la distance est la distance
+    minimale ou moyenne aux modèles selon FACE_MATCH_STRATEGY
     """
     if tolerance is None:
         tolerance = getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6)
+    if strategy is None:
+        strategy = getattr(settings, 'FACE_MATCH_STRATEGY', 'min')
     
+    start = time.perf_counter()
     try:
-        # Convertir les listes en arrays numpy
-        known_encoding = np.array(known_encoding)
-        unknown_encoding = np.array(unknown_encoding)
+        known_encodings = np.asarray(known_encodings, dtype=np.float64)
+        if known_encodings.size == 0:
+            return False, None
+        known_encodings = known_encodings.reshape(-1, known_encodings.shape[-1])
         
-        # Comparer les visages
-        results = face_recognition.compare_faces([known_encoding], unknown_encoding, tolerance=tolerance)
+        # Même calcul que face_recognition.face_distance, sans charger dlib
+        distances = np.linalg.norm(known_encodings - np.asarray(unknown_encoding), axis=1)
+        distance = float(distances.mean() if strategy == 'mean' else distances.min())
+        _record_timing(timings, 'compare', start)
         
-        return results[0] if results else False
+        return distance <= tolerance, distance
     except Exception as e:
-        print(f"Erreur lors de la comparaison des visages: {e}")
-        return False
+        logger.exception("Erreur lors de la comparaison des visages: %s", e)
+        return False, None
 
 def detect_face_in_image(image_path):
     """
     Détecte s'il y a un visage dans l'image
     """
+    import face_recognition
+    
     try:
         image = face_recognition.load_image_file(image_path)
         face_locations = face_recognition.face_locations(image)
         return len(face_locations) > 0
     except Exception as e:
-        print(f"Erreur lors de la détection du visage: {e}")
-        return False
\ No newline at end of file
+        logger.exception("Erreur lors de la détection du visage: %s", e)
+        return False
+
+_warm = False
+_warm_lock = threading.Lock()
+
+def warm_up():
+    """
+    Charge les modèles et exécute une détection et un embedding factices
+    
+    Les premiers appels de dlib sont nettement plus lents que les suivants :
+    ce coût est payé au démarrage du processus plutôt que par la première
+    requête. Sans effet si le processus est déjà chaud.
+    """
+    global _warm
+    with _warm_lock:
+        if _warm:
+            return
+        start = time.perf_counter()
+        import face_recognition
+        
+        image = np.zeros((160, 160, 3), dtype=np.uint8)
+        image[40:120, 50:110] = 180
+        params = encoding_params()
+        face_recognition.face_locations(
+            image, number_of_times_to_upsample=params['upsample'], model=params['detection_model']
+        )
+        face_recognition.face_encodings(image, known_face_locations=[(30, 130, 130, 30)], num_jitters=params['jitters'])
+        quality.to_gray(image)
+        _warm = True
+        logger.info("Modèles de reconnaissance faciale chargés en %.1f s (pid %s)", time.perf_counter() - start, os.getpid())
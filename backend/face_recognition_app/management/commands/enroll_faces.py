@@ -0,0 +1,91 @@
+import functools
+import json
+import os
+import zipfile
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.models import Agent
+from face_recognition_app.encoding_pool import EncodingPool
+from face_recognition_app.enrollment import enroll_agents
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Enrôle en masse les visages de référence à partir d'un dossier ou "
+        "d'une archive zip de photos nommées <username>.jpg"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Dossier ou archive .zip de photos")
+        # Commande hors ligne : tous les cœurs, indépendamment du réglage des workers HTTP
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Nombre de processus d'encodage (défaut: nombre de cœurs, "
+                                 "sans tenir compte de FACE_ENCODING_POOL_SIZE ni de WEB_CONCURRENCY)")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Taille des lots d'écriture en base")
+        parser.add_argument('--timeout', type=float, default=60,
+                            help="Délai maximal par photo, en secondes")
+        parser.add_argument('--report', help="Écrit le rapport détaillé dans ce fichier JSON")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Encode sans enregistrer en base")
+
+    def handle(self, *args, **options):
+        source = options['source']
+        archive = None
+        if zipfile.is_zipfile(source):
+            archive = zipfile.ZipFile(source)
+            photos = self._list_zip(archive)
+        elif os.path.isdir(source):
+            photos = self._list_directory(source)
+        else:
+            raise CommandError(f"Source introuvable ou non supportée: {source}")
+
+        pool = EncodingPool(size=options['workers'], queue_size=0, timeout=options['timeout'])
+        try:
+            if not photos:
+                raise CommandError("Aucune photo trouvée")
+
+            agents = Agent.objects.in_bulk([username for username, _ in photos], field_name='username')
+            entries = [(username, agents.get(username), image) for username, image in photos]
+            report = enroll_agents(entries, pool, options['batch_size'], options['dry_run'])
+        finally:
+            pool.shutdown()
+            if archive is not None:
+                archive.close()
+
+        for entry in report:
+            line = f"{entry['key']}: {entry['status']}"
+            if entry.get('error'):
+                line += f" ({entry['error']})"
+            self.stdout.write(line)
+
+        summary = Counter(entry['status'] for entry in report)
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{status}={count}" for status, count in sorted(summary.items()))
+        ))
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump({'summary': summary, 'results': report}, f, indent=2)
+
+    def _list_directory(self, directory):
+        photos = []
+        for name in sorted(os.listdir(directory)):
+            username, extension = os.path.splitext(name)
+            path = os.path.join(directory, name)
+            if extension.lower() in IMAGE_EXTENSIONS and os.path.isfile(path):
+                photos.append((username, path))
+        return photos
+
+    def _list_zip(self, archive):
+        # Les photos sont lues à la demande pour ne pas charger l'archive en mémoire
+        photos = []
+        for info in archive.infolist():
+            username, extension = os.path.splitext(os.path.basename(info.filename))
+            if not info.is_dir() and username and extension.lower() in IMAGE_EXTENSIONS:
+                photos.append((username, functools.partial(archive.read, info)))
+        return photos
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from agents.models import Agent
+from face_recognition_app.encoding_pool import EncodingPool
+from face_recognition_app.enrollment import cutover, reencode_agents
+from face_recognition_app.face_utils import ENROLLMENT_SUCCESS, encoding_params, encoding_version
+from face_recognition_app.models import VersionedEncoding
+
+
+class Command(BaseCommand):
+    help = (
+        "Réencode les photos de référence des agents avec un autre modèle ou "
+        "d'autres paramètres (nouvelle version, conservée à côté de l'actuelle), "
+        "puis bascule les références sur cette version avec --cutover"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--detection-model', choices=['hog', 'cnn'],
+                            help="Modèle de détection (défaut: FACE_DETECTION_MODEL)")
+        parser.add_argument('--upsample', type=int,
+                            help="Suréchantillonnages de la détection (défaut: FACE_DETECTION_UPSAMPLE)")
+        parser.add_argument('--jitters', type=int,
+                            help="Jitters de l'embedding (défaut: FACE_ENCODING_JITTERS)")
+        # Commande hors ligne : tous les cœurs, indépendamment du réglage des workers HTTP
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Nombre de processus d'encodage (défaut: nombre de cœurs, "
+                                 "sans tenir compte de FACE_ENCODING_POOL_SIZE ni de WEB_CONCURRENCY)")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Agents par lot enregistré (point de reprise)")
+        parser.add_argument('--timeout', type=float, default=120,
+                            help="Délai maximal par photo, en secondes")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Réessaie aussi les photos en échec lors d'une exécution précédente")
+        parser.add_argument('--report', help="Écrit le rapport détaillé dans ce fichier JSON")
+        parser.add_argument('--cutover', action='store_true',
+                            help="Fait de cette version la référence principale des agents réencodés")
+
+    def handle(self, *args, **options):
+        params = encoding_params(options['detection_model'], options['upsample'], options['jitters'])
+        version = encoding_version(params)
+
+        if options['cutover']:
+            switched, remaining = cutover(version, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{switched} agents basculés en version {version}"))
+            if remaining:
+                self.stdout.write(self.style.WARNING(
+                    f"{remaining} agents gardent un encodage d'une autre version "
+                    f"(photo absente ou sans visage) : à réenrôler"
+                ))
+            if version != encoding_version():
+                self.stdout.write(
+                    f"Les réglages courants encodent en version {encoding_version()} : "
+                    f"mettez à jour FACE_DETECTION_MODEL, FACE_DETECTION_UPSAMPLE et FACE_ENCODING_JITTERS"
+                )
+            return
+
+        # Reprise : les agents déjà traités dans cette version sont sautés
+        done = VersionedEncoding.objects.filter(version=version)
+        if options['retry_failed']:
+            done = done.filter(status=ENROLLMENT_SUCCESS)
+        agents = list(
+            Agent.objects
+            .exclude(photo='').exclude(photo__isnull=True)
+            .exclude(face_encoding_version=version)
+            .exclude(id__in=done.values('agent_id'))
+            .only('id', 'username', 'photo')
+            .order_by('id')
+        )
+        self.stdout.write(f"Version {version} : {len(agents)} agents à réencoder ({done.count()} déjà traités)")
+        if not agents:
+            return
+
+        start = time.perf_counter()
+
+        def progress(count):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"  {count}/{len(agents)} agents, {count / elapsed:.1f} agents/s")
+
+        pool = EncodingPool(size=options['workers'], queue_size=0, timeout=options['timeout'])
+        try:
+            report = reencode_agents(agents, pool, params, options['batch_size'], on_batch=progress)
+        finally:
+            pool.shutdown()
+
+        for entry in report:
+            if entry['status'] != ENROLLMENT_SUCCESS:
+                line = f"{entry['key']}: {entry['status']}"
+                if entry.get('error'):
+                    line += f" ({entry['error']})"
+                self.stdout.write(line)
+
+        summary = Counter(entry['status'] for entry in report)
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{status}={count}" for status, count in sorted(summary.items()))
+        ))
+
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump({'version': version, 'summary': summary, 'results': report}, f, indent=2)
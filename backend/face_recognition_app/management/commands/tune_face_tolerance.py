@@ -0,0 +1,120 @@
+import json
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from face_recognition_app.encoding_index import FaceEncodingIndex
+from interventions.models import Intervention
+
+
+class Command(BaseCommand):
+    help = (
+        "Propose un seuil FACE_RECOGNITION_TOLERANCE à partir des distances "
+        "enregistrées, sans ré-encoder aucune image"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-far', type=float, default=0.001,
+                            help="Taux de fausses acceptations visé (défaut: 0.001)")
+        parser.add_argument('--min', type=float, default=0.30, dest='min_tolerance')
+        parser.add_argument('--max', type=float, default=0.70, dest='max_tolerance')
+        parser.add_argument('--step', type=float, default=0.01)
+        parser.add_argument('--block-size', type=int, default=1024,
+                            help="Lignes de la matrice des distances imposteurs calculées à la fois (défaut: 1024)")
+        parser.add_argument('--json', action='store_true', help="Sortie JSON")
+
+    def handle(self, *args, **options):
+        # Distances authentiques : déverrouillages enregistrés
+        genuine = np.fromiter(
+            Intervention.objects
+            .filter(match_distance__isnull=False)
+            .values_list('match_distance', flat=True)
+            .iterator(),
+            dtype=np.float64
+        )
+
+        tolerances = np.round(
+            np.arange(options['min_tolerance'], options['max_tolerance'] + 1e-9, options['step']), 4
+        )
+
+        # Distances imposteurs : modèles de référence d'agents différents
+        index = FaceEncodingIndex()
+        agent_ids, encodings = index.snapshot()
+        accepted, impostor_count = self._impostor_counts(
+            agent_ids, encodings, tolerances, options['block_size']
+        )
+
+        if genuine.size == 0 or impostor_count == 0:
+            raise CommandError(
+                "Pas assez de données : il faut des interventions avec distance "
+                "et au moins deux agents enrôlés."
+            )
+
+        genuine.sort()
+        # Recherche dichotomique sur les distances triées : O(n log n) au total
+        frr = 1.0 - np.searchsorted(genuine, tolerances, side='right') / genuine.size
+        far = accepted / impostor_count
+
+        acceptable = np.flatnonzero(far <= options['target_far'])
+        recommended = float(tolerances[acceptable[-1]]) if acceptable.size else None
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'current': getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6),
+                'recommended': recommended,
+                'genuine_count': int(genuine.size),
+                'impostor_count': impostor_count,
+                'curve': [
+                    {'tolerance': float(t), 'far': float(a), 'frr': float(r)}
+                    for t, a, r in zip(tolerances, far, frr)
+                ],
+            }, indent=2))
+            return
+
+        self.stdout.write(f"Distances authentiques: {genuine.size}, imposteurs: {impostor_count}")
+        self.stdout.write("Seuil   FAR       FRR")
+        for t, a, r in zip(tolerances, far, frr):
+            self.stdout.write(f"{t:.2f}    {a:.5f}   {r:.5f}")
+
+        self.stdout.write(
+            "Note: seuls les déverrouillages acceptés sont enregistrés, le FRR "
+            "est donc sous-estimé au-delà du seuil actuel."
+        )
+        if recommended is None:
+            self.stdout.write(self.style.WARNING("Aucun seuil n'atteint le FAR visé."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Seuil recommandé (FAR <= {options['target_far']}): {recommended:.2f} "
+                f"(actuel: {getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6)})"
+            ))
+
+    def _impostor_counts(self, agent_ids, encodings, tolerances, block_size):
+        """
+        Nombre de paires d'agents différents acceptées à chaque seuil, et
+        nombre total de paires
+
+        La matrice des distances est parcourue par blocs de block_size lignes :
+        la mémoire reste en O(block_size × N) au lieu de O(N²).
+        """
+        accepted = np.zeros(len(tolerances), dtype=np.int64)
+        total = 0
+        count = len(agent_ids)
+        if count < 2:
+            return accepted, total
+        squared_norms = np.einsum('ij,ij->i', encodings, encodings)
+        columns = np.arange(count)
+        for start in range(0, count - 1, max(1, block_size)):
+            stop = min(start + block_size, count)
+            block = encodings[start:stop]
+            squared = squared_norms[start:stop, None] + squared_norms[None, :] - 2.0 * (block @ encodings.T)
+            # Triangle supérieur uniquement (chaque paire une fois), agents différents
+            pairs = (
+                (columns[None, :] > columns[start:stop, None])
+                & (agent_ids[start:stop, None] != agent_ids[None, :])
+            )
+            distances = np.sqrt(np.maximum(squared[pairs], 0.0))
+            distances.sort()
+            accepted += np.searchsorted(distances, tolerances, side='right')
+            total += distances.size
+        return accepted, total
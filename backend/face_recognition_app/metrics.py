@@ -0,0 +1,230 @@
+"""
+Métriques de la reconnaissance faciale au format texte Prometheus
+
+Les valeurs sont tenues en mémoire, par processus serveur. Avec plusieurs
+workers (gunicorn, uvicorn), chaque requête de collecte n'atteint qu'un
+worker : sans FACE_METRICS_DIR, les séries passeraient des valeurs d'un
+worker à celles d'un autre. Avec FACE_METRICS_DIR, chaque worker écrit ses
+valeurs dans ce dossier partagé après chaque requête, et /metrics/ renvoie
+la somme de tous les fichiers. Les durées mesurées dans les processus
+d'encodage sont renvoyées avec le résultat et enregistrées côté serveur.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Counter:
+    """
+    Compteur monotone, une valeur par combinaison de labels
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def state(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def render(self, states=None):
+        """
+        states : états (state()) à additionner, par défaut celui de ce processus
+        """
+        values = {}
+        for state in states if states is not None else [self.state()]:
+            for labels, value in state:
+                values[tuple(labels)] = values.get(tuple(labels), 0) + value
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """
+    Histogramme de durées (secondes) à seaux cumulés
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [comptes par seau (+Inf en dernier), somme, nombre]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def state(self):
+        with self._lock:
+            return [
+                [list(labels), list(counts), total, count]
+                for labels, (counts, total, count) in self._series.items()
+            ]
+
+    def render(self, states=None):
+        """
+        states : états (state()) à additionner, par défaut celui de ce processus
+        """
+        series = {}
+        for state in states if states is not None else [self.state()]:
+            for labels, counts, total, count in state:
+                merged = series.setdefault(tuple(labels), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                label_text = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+request_duration = Histogram(
+    'faceid_request_duration_seconds',
+    "Durée totale des requêtes de reconnaissance faciale",
+    ['view'],
+)
+stage_duration = Histogram(
+    'faceid_stage_duration_seconds',
+    "Durée de chaque étape (décodage, détection, embedding, comparaison, base de données)",
+    ['view', 'stage'],
+)
+outcomes = Counter(
+    'faceid_outcomes_total',
+    "Résultats des requêtes (success, no_face, mismatch, role_denied...)",
+    ['view', 'outcome'],
+)
+encoding_cache = Counter(
+    'faceid_encoding_cache_total',
+    "Consultations du cache des encodages par contenu d'image (hit, miss)",
+    ['result'],
+)
+encoding_cache_evictions = Counter(
+    'faceid_encoding_cache_evictions_total',
+    "Entrées évincées du cache des encodages (limite mémoire)",
+)
+burst_frames = Counter(
+    'faceid_burst_frames_total',
+    "Captures des rafales de vérification : reçues, détectées, encodées",
+    ['stage'],
+)
+
+REGISTRY = [request_duration, stage_duration, outcomes, encoding_cache, encoding_cache_evictions, burst_frames]
+
+
+def record_request(view, duration, timings, outcome):
+    """
+    Enregistre la durée totale, les durées par étape et le résultat d'une requête
+    """
+    request_duration.observe(duration, view)
+    for stage, stage_time in timings.items():
+        stage_duration.observe(stage_time, view, stage)
+    outcomes.inc(view, outcome)
+    write_snapshot()
+
+
+def metrics_dir():
+    return getattr(settings, 'FACE_METRICS_DIR', None)
+
+
+def write_snapshot():
+    """
+    Écrit les valeurs de ce processus dans FACE_METRICS_DIR (un fichier par
+    processus, remplacé de façon atomique)
+    """
+    directory = metrics_dir()
+    if not directory:
+        return
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump({metric.name: metric.state() for metric in REGISTRY}, f)
+        os.replace(f'{path}.tmp', path)
+    except OSError as e:
+        logger.warning("Écriture des métriques impossible: %s", e)
+
+
+def read_snapshots(directory):
+    """
+    États de tous les processus ayant écrit dans le dossier ; les fichiers
+    des workers arrêtés sont conservés, pour que les compteurs restent monotones
+    """
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning("Lecture des métriques %s impossible: %s", name, e)
+    return snapshots
+
+
+def render():
+    """
+    Retourne toutes les métriques au format d'exposition texte Prometheus
+    
+    Avec FACE_METRICS_DIR : somme des valeurs de tous les workers.
+    """
+    directory = metrics_dir()
+    snapshots = None
+    if directory:
+        write_snapshot()
+        snapshots = read_snapshots(directory)
+    lines = []
+    for metric in REGISTRY:
+        states = None if snapshots is None else [snapshot.get(metric.name, []) for snapshot in snapshots]
+        lines.extend(metric.render(states))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('encoding', models.BinaryField()),
+                ('source', models.CharField(choices=[('enrôlement', 'Enrôlement'), ('capture', 'Capture live')], default='enrôlement', max_length=20)),
+                ('distance', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_templates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Modèle de visage',
+                'verbose_name_plural': 'Modèles de visage',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def tag_existing_templates(apps, schema_editor):
+    """
+    Les modèles existants ont été encodés en HOG, sans jitter supplémentaire
+    (version figée, comme agents.0004_face_encoding_version)
+    """
+    FaceTemplate = apps.get_model('face_recognition_app', 'FaceTemplate')
+    FaceTemplate.objects.update(version=f"hog-u{getattr(settings, 'FACE_DETECTION_UPSAMPLE', 1)}-j1")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('face_recognition_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facetemplate',
+            name='version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.RunPython(tag_existing_templates, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='VersionedEncoding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=32)),
+                ('encoding', models.BinaryField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versioned_encodings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Encodage versionné',
+                'verbose_name_plural': 'Encodages versionnés',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='versionedencoding',
+            constraint=models.UniqueConstraint(fields=('agent', 'version'), name='versioned_encoding_uniq'),
+        ),
+    ]
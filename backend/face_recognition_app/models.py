@@ -1,4 +1,155 @@
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+import numpy as np
+from agents.models import Agent
+from .encoding_codec import pack_encoding, unpack_encoding
+from .face_utils import encoding_version
 
-# Les modèles de reconnaissance faciale sont intégrés dans le modèle Agent
-# Ce fichier peut contenir des modèles supplémentaires si nécessaire
\ No newline at end of file
+# L'encodage de référence principal est stocké dans le modèle Agent ;
+# les modèles supplémentaires (galerie) et les encodages des autres versions
+# de modèle sont stockés ici
+
+class FaceTemplate(models.Model):
+    SOURCE_CHOICES = [
+        ('enrôlement', 'Enrôlement'),
+        ('capture', 'Capture live'),
+    ]
+    
+    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, related_name='face_templates')
+    encoding = models.BinaryField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='enrôlement')
+    distance = models.FloatField(null=True, blank=True)  # Distance lors de la capture live
+    version = models.CharField(max_length=32, blank=True, default='')  # face_utils.encoding_version
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.agent.nom} - {self.source} - {self.created_at:%Y-%m-%d}"
+    
+    def get_encoding(self):
+        return unpack_encoding(self.encoding)
+    
+    class Meta:
+        verbose_name = "Modèle de visage"
+        verbose_name_plural = "Modèles de visage"
+        ordering = ['created_at']
+
+
+class VersionedEncoding(models.Model):
+    """
+    Encodage de référence d'un agent pour une autre version que celle de
+    Agent.face_encoding
+    
+    Le réencodage (manage.py reencode_faces) y prépare la nouvelle version
+    sans toucher aux encodages en service ; la bascule y archive l'ancienne.
+    Un échec (aucun visage, photo illisible...) est enregistré avec son
+    statut et sans encodage, pour que la reprise ne le recalcule pas.
+    """
+    agent = models.ForeignKey(Agent, on_delete=models.CASCADE, related_name='versioned_encodings')
+    version = models.CharField(max_length=32)
+    encoding = models.BinaryField(null=True, blank=True)
+    status = models.CharField(max_length=20)  # Statut d'enrôlement (face_utils.ENROLLMENT_*)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.agent.nom} - {self.version} - {self.status}"
+    
+    class Meta:
+        verbose_name = "Encodage versionné"
+        verbose_name_plural = "Encodages versionnés"
+        constraints = [
+            models.UniqueConstraint(fields=['agent', 'version'], name='versioned_encoding_uniq'),
+        ]
+
+
+def reference_encoding(agent, version):
+    """
+    Encodage de référence de l'agent dans la version demandée, ou None
+    
+    Agent.face_encoding s'il est de cette version, sinon l'encodage préparé
+    ou archivé de VersionedEncoding : les deux versions coexistent jusqu'à
+    la bascule, quel que soit l'ordre du déploiement des réglages.
+    """
+    if agent.face_encoding_version == version:
+        return agent.get_face_encoding()
+    blob = (
+        VersionedEncoding.objects
+        .filter(agent_id=agent.id, version=version, encoding__isnull=False)
+        .values_list('encoding', flat=True)
+        .first()
+    )
+    return unpack_encoding(blob)
+
+
+async def areference_encoding(agent, version):
+    """
+    Version asynchrone de reference_encoding
+    """
+    if agent.face_encoding_version == version:
+        return agent.get_face_encoding()
+    blob = await (
+        VersionedEncoding.objects
+        .filter(agent_id=agent.id, version=version, encoding__isnull=False)
+        .values_list('encoding', flat=True)
+        .afirst()
+    )
+    return unpack_encoding(blob)
+
+
+def build_gallery(primary_encoding, template_blobs):
+    """
+    Empile l'encodage principal et les modèles supplémentaires en une matrice
+    """
+    encodings = [unpack_encoding(blob) for blob in template_blobs]
+    if primary_encoding is not None:
+        encodings.insert(0, primary_encoding)
+    encodings = [encoding for encoding in encodings if encoding is not None]
+    if not encodings:
+        return None
+    return np.vstack(encodings)
+
+
+def load_agent_gallery(agent):
+    """
+    Retourne la galerie d'encodages d'un agent (matrice k x 128) ou None
+    
+    Seuls les encodages de la version courante y figurent : ceux d'un autre
+    modèle ou d'autres paramètres ne sont pas comparables aux captures live.
+    """
+    version = encoding_version()
+    template_blobs = FaceTemplate.objects.filter(agent_id=agent.id, version=version).values_list('encoding', flat=True)
+    return build_gallery(reference_encoding(agent, version), template_blobs)
+
+
+def maybe_add_live_template(agent_id, encoding, distance):
+    """
+    Ajoute une capture live très sûre à la galerie de l'agent, si la
+    politique est activée (FACE_TEMPLATE_AUTO_ADD_DISTANCE)
+    
+    Au plus une capture par intervalle ; galerie pleine : la plus ancienne
+    capture est remplacée, les photos d'enrôlement ne sont jamais supprimées.
+    """
+    max_distance = getattr(settings, 'FACE_TEMPLATE_AUTO_ADD_DISTANCE', None)
+    if max_distance is None or distance is None or distance > max_distance:
+        return None
+    
+    captures = FaceTemplate.objects.filter(agent_id=agent_id, source='capture')
+    interval = timedelta(hours=getattr(settings, 'FACE_TEMPLATE_AUTO_ADD_INTERVAL_HOURS', 24))
+    if captures.filter(created_at__gte=timezone.now() - interval).exists():
+        return None
+    
+    max_templates = getattr(settings, 'FACE_TEMPLATE_MAX_PER_AGENT', 5)
+    if FaceTemplate.objects.filter(agent_id=agent_id).count() >= max_templates:
+        oldest = captures.order_by('created_at').first()
+        if oldest is None:
+            return None
+        oldest.delete()
+    
+    return FaceTemplate.objects.create(
+        agent_id=agent_id,
+        encoding=pack_encoding(encoding),
+        source='capture',
+        distance=distance,
+        version=encoding_version()
+    )
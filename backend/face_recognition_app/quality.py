@@ -0,0 +1,102 @@
+"""
+Contrôle qualité des captures live avant l'embedding
+
+Une image floue, sur- ou sous-exposée, avec un visage trop petit ou plusieurs
+visages ne peut pas être vérifiée de façon fiable : elle est rejetée avec un
+motif que la borne peut afficher, sans payer l'embedding ResNet (et, pour
+l'exposition, sans même lancer la détection).
+
+Toutes les mesures se font sur l'image de détection (réduite) en niveaux de
+gris avec OpenCV (importé au premier usage, comme dans face_utils).
+"""
+import numpy as np
+from django.conf import settings
+
+# Motifs de rejet
+TOO_DARK = 'too_dark'
+OVEREXPOSED = 'overexposed'
+MULTIPLE_FACES = 'multiple_faces'
+FACE_TOO_SMALL = 'face_too_small'
+BLURRY = 'blurry'
+
+# Consignes affichées par la borne
+REJECTION_MESSAGES = {
+    TOO_DARK: "Image trop sombre. Améliorez l'éclairage et réessayez.",
+    OVEREXPOSED: "Image surexposée. Évitez le contre-jour et réessayez.",
+    MULTIPLE_FACES: "Plusieurs visages détectés. Une seule personne doit se présenter face à la caméra.",
+    FACE_TOO_SMALL: "Visage trop petit ou trop loin. Rapprochez-vous de la caméra.",
+    BLURRY: "Image floue. Restez immobile face à la caméra et réessayez.",
+}
+
+# Côté du visage normalisé pour la mesure de netteté (indépendante de la résolution)
+SHARPNESS_SIZE = 128
+
+
+def quality_checks_enabled():
+    return getattr(settings, 'FACE_QUALITY_CHECKS', True)
+
+
+def to_gray(image_array):
+    import cv2
+    return cv2.cvtColor(np.ascontiguousarray(image_array), cv2.COLOR_RGB2GRAY)
+
+
+def check_exposure(gray):
+    """
+    Retourne TOO_DARK / OVEREXPOSED selon la luminosité moyenne, ou None
+    """
+    low, high = getattr(settings, 'FACE_QUALITY_BRIGHTNESS_RANGE', (40, 220))
+    brightness = float(gray.mean())
+    if brightness < low:
+        return TOO_DARK
+    if brightness > high:
+        return OVEREXPOSED
+    return None
+
+
+def sharpness(gray, location):
+    """
+    Variance du laplacien sur le visage ramené à SHARPNESS_SIZE pixels
+    """
+    import cv2
+
+    top, right, bottom, left = location
+    face = gray[max(0, top):bottom, max(0, left):right]
+    if face.size == 0:
+        return 0.0
+    face = cv2.resize(face, (SHARPNESS_SIZE, SHARPNESS_SIZE), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(face, cv2.CV_64F).var())
+
+
+def frame_sharpness(gray):
+    """
+    Netteté de l'image entière, pour classer les captures d'une rafale
+    """
+    return sharpness(gray, (0, gray.shape[1], gray.shape[0], 0))
+
+
+def face_side(location):
+    top, right, bottom, left = location
+    return min(bottom - top, right - left)
+
+
+def check_faces(gray, face_locations, scale):
+    """
+    Contrôle le nombre, la taille et la netteté des visages détectés
+
+    face_locations est exprimé dans l'image de détection, réduite du facteur
+    scale ; la taille minimale (FACE_QUALITY_MIN_FACE_SIZE) l'est en pixels de
+    l'image d'origine. Seuls les visages assez grands comptent : un collègue
+    au loin dans le champ ne fait pas rejeter la capture.
+    """
+    min_size = getattr(settings, 'FACE_QUALITY_MIN_FACE_SIZE', 80)
+    large = [loc for loc in face_locations if face_side(loc) / scale >= min_size]
+    if not large:
+        return FACE_TOO_SMALL
+    if len(large) > getattr(settings, 'FACE_QUALITY_MAX_FACES', 1):
+        return MULTIPLE_FACES
+
+    largest = max(large, key=face_side)
+    if sharpness(gray, largest) < getattr(settings, 'FACE_QUALITY_MIN_SHARPNESS', 15):
+        return BLURRY
+    return None
@@ -1,11 +1,59 @@
+from django.conf import settings
 from rest_framework import serializers
 
+class PhotoField(serializers.Field):
+    """
+    Photo en base64 (JSON) ou en octets (multipart, corps binaire brut)
+    """
+    default_error_messages = {
+        'invalid': "Photo attendue : image base64 ou fichier image.",
+        'blank': "La photo est vide.",
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, bytes)):
+            self.fail('invalid')
+        if not (data.strip() if isinstance(data, str) else data):
+            self.fail('blank')
+        return data
+
+    def to_representation(self, value):
+        return value
+
 class FaceVerificationSerializer(serializers.Serializer):
-    live_photo = serializers.CharField()  # Base64 image
+    live_photo = PhotoField()
     agent_id = serializers.IntegerField()
     problem_type = serializers.ChoiceField(choices=[
         ('matière', 'Matière'),
         ('technique', 'Technique'),
         ('câblage', 'Câblage')
     ])
-    machine_id = serializers.IntegerField()
\ No newline at end of file
+    machine_id = serializers.IntegerField()
+
+class FaceBurstVerificationSerializer(FaceVerificationSerializer):
+    live_photo = None
+    live_photos = serializers.ListField(child=PhotoField(), allow_empty=False)
+
+    def validate_live_photos(self, frames):
+        max_frames = getattr(settings, 'FACE_BURST_MAX_FRAMES', 5)
+        if len(frames) > max_frames:
+            raise serializers.ValidationError(f"{max_frames} captures maximum par rafale.")
+        return frames
+
+class FaceIdentificationSerializer(serializers.Serializer):
+    live_photo = PhotoField()
+
+
+class BulkEnrollmentItemSerializer(serializers.Serializer):
+    agent_id = serializers.IntegerField()
+    photo = serializers.CharField()  # Base64 image
+
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    items = serializers.ListField(child=BulkEnrollmentItemSerializer(), allow_empty=False)
+
+    def validate_items(self, items):
+        max_items = getattr(settings, 'FACE_BULK_ENROLLMENT_MAX_ITEMS', 200)
+        if len(items) > max_items:
+            raise serializers.ValidationError(f"{max_items} photos maximum par requête.")
+        return items
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from agents.models import Agent
+from machines.models import Machine
+from .agent_cache import invalidate_agent, invalidate_machine
+from .encoding_index import face_index
+from .models import FaceTemplate, load_agent_gallery
+
+
+INDEXED_FIELDS = {'face_encoding', 'face_encoding_version', 'is_active'}
+CACHED_FIELDS = INDEXED_FIELDS | {'nom', 'role'}
+
+
+@receiver(post_save, sender=Agent)
+def update_face_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Maintient l'index 1:N à jour après l'enregistrement d'un agent
+    """
+    # Ex: update_last_login à chaque connexion ne touche ni le cache ni l'index
+    if update_fields is None or CACHED_FIELDS.intersection(update_fields):
+        invalidate_agent(instance.id)
+
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+
+    if instance.is_active:
+        face_index.update_agent(instance.id, load_agent_gallery(instance))
+    else:
+        face_index.remove_agent(instance.id)
+
+
+@receiver(post_delete, sender=Agent)
+def remove_from_face_index(sender, instance, **kwargs):
+    """
+    Retire un agent supprimé de l'index 1:N
+    """
+    invalidate_agent(instance.id)
+    face_index.remove_agent(instance.id)
+
+
+@receiver(post_save, sender=FaceTemplate)
+@receiver(post_delete, sender=FaceTemplate)
+def update_face_index_gallery(sender, instance, **kwargs):
+    """
+    Répercute l'ajout ou la suppression d'un modèle de galerie dans l'index
+    """
+    invalidate_agent(instance.agent_id)
+
+    try:
+        agent = Agent.objects.get(id=instance.agent_id)
+    except Agent.DoesNotExist:
+        # Suppression en cascade de l'agent : déjà retiré de l'index
+        return
+
+    if agent.is_active:
+        face_index.update_agent(agent.id, load_agent_gallery(agent))
+
+
+@receiver(post_save, sender=Machine)
+@receiver(post_delete, sender=Machine)
+def invalidate_machine_cache(sender, instance, **kwargs):
+    invalidate_machine(instance.id)
@@ -0,0 +1,157 @@
+"""
+Outils communs aux tests et aux benchmarks de la reconnaissance faciale
+
+Jeu d'images de visages synthétiques, reproductible et hors ligne : les
+visages sont dessinés avec PIL à partir d'une graine ; seules les graines
+dont le visage est effectivement détecté par dlib sont retenues, de sorte
+que tests et benchmarks exercent toute la chaîne détection + embedding.
+"""
+import base64
+import functools
+import io
+
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+from agents.models import Agent
+from machines.models import Machine
+from . import encoding_pool
+from .encoding_cache import encoding_cache
+from .encoding_pool import EncodingPool
+from .face_utils import encode_face_from_image
+
+FACE_SIZE = 640
+
+
+def draw_face(seed, size=FACE_SIZE):
+    """
+    Dessine un visage stylisé (ovale, yeux, sourcils, nez, bouche)
+    """
+    rng = np.random.default_rng(seed)
+    image = Image.new('RGB', (size, size), tuple(int(c) for c in rng.integers(170, 230, 3)))
+    draw = ImageDraw.Draw(image)
+
+    cx, cy = size / 2, size / 2
+    w = size * 0.28 * (1 + rng.uniform(-0.08, 0.08))
+    h = size * 0.36 * (1 + rng.uniform(-0.05, 0.05))
+    skin = tuple(int(c) for c in rng.integers(150, 230, 3))
+    draw.ellipse([cx - w, cy - h, cx + w, cy + h], fill=skin)
+
+    eye_y = cy - h * rng.uniform(0.15, 0.25)
+    eye_x = w * rng.uniform(0.38, 0.46)
+    for side in (-1, 1):
+        x = cx + side * eye_x
+        draw.ellipse([x - w * 0.18, eye_y - h * 0.06, x + w * 0.18, eye_y + h * 0.06], fill=(255, 255, 255))
+        draw.ellipse([x - w * 0.07, eye_y - h * 0.05, x + w * 0.07, eye_y + h * 0.05], fill=(40, 30, 20))
+        draw.line(
+            [x - w * 0.22, eye_y - h * 0.15, x + w * 0.22, eye_y - h * rng.uniform(0.14, 0.19)],
+            fill=(60, 40, 30), width=int(size * 0.015)
+        )
+
+    nose = tuple(int(c * 0.85) for c in skin)
+    draw.polygon([(cx, eye_y + h * 0.05), (cx - w * 0.12, cy + h * 0.2), (cx + w * 0.12, cy + h * 0.2)], fill=nose)
+    draw.chord([cx - w * 0.35, cy + h * 0.3, cx + w * 0.35, cy + h * 0.5], 0, 180, fill=(150, 50, 50))
+
+    return image.filter(ImageFilter.GaussianBlur(size / 300))
+
+
+def detectable_faces(count, max_seed=2000):
+    """
+    Retourne `count` couples (graine, image) dont le visage est détecté
+    """
+    import face_recognition
+
+    faces = []
+    for seed in range(max_seed):
+        image = draw_face(seed)
+        if len(face_recognition.face_locations(np.asarray(image))) == 1:
+            faces.append((seed, image))
+            if len(faces) == count:
+                return faces
+    raise RuntimeError(f"Seulement {len(faces)} visages synthétiques détectés sur {max_seed} graines")
+
+
+def frame(face, frame_size, seed=0):
+    """
+    Place le visage dans une image de caméra de taille frame_size (bruit de fond)
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    background = rng.integers(90, 140, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(background)
+    side = int(min(width, height) * 0.8)
+    image.paste(face.resize((side, side), Image.BILINEAR), ((width - side) // 2, (height - side) // 2))
+    return image
+
+
+def variant(image, seed):
+    """
+    Variante « capture live » : luminosité légèrement différente
+    """
+    rng = np.random.default_rng(seed)
+    return ImageEnhance.Brightness(image).enhance(rng.uniform(0.9, 1.1))
+
+
+def to_data_url(image, quality=90):
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg(image, quality)).decode()
+
+
+def random_encodings(count, seed=0):
+    """
+    Encodages aléatoires de même ordre de grandeur que ceux de dlib
+    """
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.09, (count, 128))
+
+
+def jpeg(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def synthetic_photos(count=1):
+    """
+    Photos JPEG (référence, capture live) de `count` visages distincts,
+    calculées une fois par processus
+    """
+    photos = []
+    for seed, face in detectable_faces(count):
+        reference = frame(face, (1280, 720), seed)
+        photos.append((jpeg(reference), jpeg(variant(reference, seed))))
+    return tuple(photos)
+
+
+@override_settings(FACE_ENCODING_POOL_SIZE=0)
+class FaceRecognitionTestCase(TestCase):
+    """
+    Agent 'qualité' et machine de test, encodage dans le processus de test
+
+    reference / live : photos du visage de l'agent.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        (cls.reference, cls.live), = synthetic_photos()
+
+    def setUp(self):
+        cache.clear()
+        encoding_cache.clear()
+        self.addCleanup(setattr, encoding_pool, '_pool', encoding_pool._pool)
+        encoding_pool._pool = EncodingPool(size=0)
+        self.agent = Agent.objects.create_user(
+            username='q1', email='q1@example.com', password='pw', nom='Q1', role='qualité'
+        )
+        self.machine = Machine.objects.create(nom_machine='M1', localisation='L1')
+
+    def enroll(self, agent=None):
+        """
+        Enregistre la photo de référence comme encodage de l'agent
+        """
+        agent = agent or self.agent
+        agent.set_face_encoding(encode_face_from_image(self.reference))
+        agent.save()
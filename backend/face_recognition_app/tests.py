@@ -0,0 +1,423 @@
+import base64
+import functools
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from concurrent.futures import Future
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from agents.models import Agent
+from interventions.models import Intervention
+from . import encoding_pool, metrics
+from .encoding_cache import EncodingCache
+from .encoding_codec import pack_encoding, unpack_encoding
+from .encoding_index import GENERATION_CACHE_KEY, FaceEncodingIndex
+from .encoding_pool import EncodingPool, EncodingQueueFull, default_pool_size
+from .enrollment import cutover
+from .face_utils import ENROLLMENT_NO_FACE, ENROLLMENT_SUCCESS, encoding_version
+from .management.commands.enroll_faces import Command as EnrollFaces
+from .management.commands.reencode_faces import Command as ReencodeFaces
+from .management.commands.tune_face_tolerance import Command as TuneFaceTolerance
+from .models import VersionedEncoding
+from .testing import FaceRecognitionTestCase, jpeg, random_encodings
+
+
+class BulkEnrollmentTests(FaceRecognitionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = Agent.objects.create_user(
+            username='admin', email='admin@example.com', password='pw', nom='Admin', role='admin'
+        )
+        self.client = APIClient()
+
+    def verify(self):
+        return self.client.post('/api/face-recognition/verify/', {
+            'agent_id': self.agent.id,
+            'machine_id': self.machine.id,
+            'problem_type': 'matière',
+            'live_photo': io.BytesIO(self.live),
+        })
+
+    def bulk_upload(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post('/api/face-recognition/bulk-upload-encodings/', {
+            'items': [{'agent_id': self.agent.id, 'photo': base64.b64encode(self.reference).decode()}]
+        }, format='json')
+
+    def test_verify_after_bulk_enrollment(self):
+        # Sans référence : l'entrée de l'agent est mise en cache sans galerie
+        self.assertEqual(self.verify().status_code, 400)
+
+        response = self.bulk_upload(self.admin)
+        self.assertEqual(response.json()['summary'], {'success': 1})
+
+        response = self.verify()
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertTrue(response.json()['is_match'])
+
+    def test_requires_admin(self):
+        response = self.bulk_upload(self.agent)
+        self.assertEqual(response.status_code, 403)
+        self.agent.refresh_from_db()
+        self.assertIsNone(self.agent.face_encoding)
+
+    def test_oversized_photo_is_not_decoded(self):
+        with override_settings(FACE_UPLOAD_MAX_BYTES=1024), \
+                mock.patch('face_recognition_app.views.decode_base64_image') as decode:
+            response = self.bulk_upload(self.admin)
+        self.assertEqual(response.status_code, 413)
+        decode.assert_not_called()
+
+
+class VerificationCases:
+    """
+    Cas de vérification communs à verify/ et verify-async/ ; les sous-classes
+    définissent post(body) et retournent (statut, en-têtes, corps JSON)
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.enroll()
+
+    def verify(self, photo, problem_type='matière'):
+        return self.post({
+            'agent_id': self.agent.id,
+            'machine_id': self.machine.id,
+            'problem_type': problem_type,
+            'live_photo': 'data:image/jpeg;base64,' + base64.b64encode(photo).decode(),
+        })
+
+    def test_match(self):
+        status_code, _, body = self.verify(self.live)
+        self.assertEqual(status_code, 200, body)
+        self.assertTrue(body['is_match'])
+        self.assertTrue(Intervention.objects.filter(pk=body['intervention_id'], statut='résolu').exists())
+
+    def test_mismatch(self):
+        # Les visages synthétiques se ressemblent : seuil abaissé sous la distance de la capture
+        with override_settings(FACE_RECOGNITION_TOLERANCE=0.01):
+            status_code, _, body = self.verify(self.live)
+        self.assertEqual(status_code, 403, body)
+        self.assertFalse(body['is_match'])
+        self.assertEqual(body['message'], "Le visage ne correspond pas à la référence.")
+        self.assertFalse(Intervention.objects.exists())
+
+    def test_no_face(self):
+        status_code, _, body = self.verify(jpeg(Image.new('RGB', (640, 480), (128, 128, 128))))
+        self.assertEqual(status_code, 400, body)
+        self.assertEqual(body['message'], "Aucun visage détecté dans la photo. Veuillez réessayer.")
+
+    def test_role_denied(self):
+        status_code, _, body = self.verify(self.live, problem_type='technique')
+        self.assertEqual(status_code, 403, body)
+        self.assertFalse(body['is_authorized'])
+        self.assertIn("'qualité'", body['message'])
+
+    def test_quality_rejection(self):
+        status_code, _, body = self.verify(jpeg(Image.new('RGB', (640, 480), (5, 5, 5))))
+        self.assertEqual(status_code, 400, body)
+        self.assertEqual(body['rejection'], 'too_dark')
+
+    def test_queue_full(self):
+        with mock.patch.object(EncodingPool, 'submit', side_effect=EncodingQueueFull("File d'encodage pleine")):
+            status_code, headers, body = self.verify(self.live)
+        self.assertEqual(status_code, 503, body)
+        self.assertEqual(headers['Retry-After'], '1')
+
+    def test_timeout(self):
+        # Travail jamais terminé : le délai du pool expire
+        with mock.patch.object(EncodingPool, 'submit', return_value=Future()), \
+                mock.patch.object(encoding_pool.get_encoding_pool(), 'timeout', 0.01):
+            status_code, _, body = self.verify(self.live)
+        self.assertEqual(status_code, 503, body)
+        self.assertEqual(body['message'], "Délai de reconnaissance dépassé. Veuillez réessayer.")
+
+    def test_oversized_json_is_not_parsed(self):
+        # Corps refusé sur sa taille, avant l'analyse JSON et le contrôle de la photo
+        with override_settings(FACE_UPLOAD_MAX_BYTES=1024):
+            status_code, _, body = self.verify(b'\0' * 100 * 1024)
+        self.assertEqual(status_code, 413, body)
+        self.assertTrue(body['detail'].startswith("Requête trop volumineuse"), body)
+
+
+class VerificationTests(VerificationCases, FaceRecognitionTestCase):
+    def post(self, body):
+        response = APIClient().post('/api/face-recognition/verify/', body, format='json')
+        return response.status_code, response.headers, response.json()
+
+
+class AsyncVerificationTests(VerificationCases, FaceRecognitionTestCase):
+    def post(self, body):
+        response = async_to_sync(AsyncClient().post)(
+            '/api/face-recognition/verify-async/', body, content_type='application/json'
+        )
+        return response.status_code, response.headers, response.json()
+
+
+class BurstVerificationTests(FaceRecognitionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enroll()
+
+    def verify_burst(self, frames):
+        return APIClient().post('/api/face-recognition/verify-burst/', {
+            'agent_id': self.agent.id,
+            'machine_id': self.machine.id,
+            'problem_type': 'matière',
+            'live_photos': frames,
+        }, format='json')
+
+    def test_empty_frames_are_invalid(self):
+        live = base64.b64encode(self.live).decode()
+        response = self.verify_burst(['data:image/jpeg;base64,', '%%%', 'data:image/jpeg;base64,' + live])
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertEqual(response.json()['frame'], 2)
+        self.assertEqual([entry['result'] for entry in response.json()['frames']][:2], ['invalid_image'] * 2)
+
+    def test_burst_body_allows_every_frame(self):
+        frames = ['data:image/jpeg;base64,' + base64.b64encode(self.live).decode()] * 3
+        with override_settings(FACE_UPLOAD_MAX_BYTES=len(self.live) + 1024):
+            response = self.verify_burst(frames)
+        self.assertEqual(response.status_code, 200, response.json())
+
+    def test_only_empty_frames(self):
+        response = self.verify_burst(['data:image/jpeg;base64,', '%%%'])
+        self.assertEqual(response.status_code, 400, response.json())
+        self.assertEqual(response.json()['work']['encoded'], 0)
+
+
+class IdentificationTests(FaceRecognitionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enroll()
+        self.client = APIClient()
+
+    def identify(self):
+        return self.client.post('/api/face-recognition/identify/', {'live_photo': io.BytesIO(self.live)})
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.identify().status_code, 401)
+
+    def test_returns_only_public_fields(self):
+        self.client.force_authenticate(self.agent)
+        response = self.identify()
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertEqual(response.json()['agent'], {'id': self.agent.id, 'nom': 'Q1', 'role': 'qualité'})
+
+
+class ReencodeTests(FaceRecognitionTestCase):
+    """
+    reencode_faces --jitters 2 : nouvelle version préparée à côté de la version courante
+    """
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.current = encoding_version()
+        self.new = encoding_version({'detection_model': 'hog', 'upsample': 1, 'jitters': 2})
+        self.sentinel = pack_encoding(random_encodings(1)[0])
+        self.enroll()
+        self.agent.photo.save('q1.jpg', ContentFile(self.reference))
+        self.other = Agent.objects.create_user(
+            username='q2', email='q2@example.com', password='pw', nom='Q2', role='qualité'
+        )
+        self.other.photo.save('q2.jpg', ContentFile(self.reference))
+
+    def reencode(self, *args):
+        out = io.StringIO()
+        call_command('reencode_faces', '--jitters', '2', '--workers', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def staged(self, agent):
+        return VersionedEncoding.objects.get(agent=agent, version=self.new)
+
+    def test_resume_skips_agents_already_done(self):
+        VersionedEncoding.objects.create(
+            agent=self.agent, version=self.new, encoding=self.sentinel, status=ENROLLMENT_SUCCESS
+        )
+        output = self.reencode()
+        self.assertIn("1 agents à réencoder (1 déjà traités)", output)
+        self.assertEqual(bytes(self.staged(self.agent).encoding), self.sentinel)
+        self.assertEqual(self.staged(self.other).status, ENROLLMENT_SUCCESS)
+        # Les encodages en service ne changent pas avant la bascule
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.face_encoding_version, self.current)
+
+    def test_retry_failed_retries_only_failures(self):
+        VersionedEncoding.objects.create(agent=self.agent, version=self.new, status=ENROLLMENT_NO_FACE)
+        VersionedEncoding.objects.create(
+            agent=self.other, version=self.new, encoding=self.sentinel, status=ENROLLMENT_SUCCESS
+        )
+        self.assertIn("0 agents à réencoder", self.reencode())
+
+        self.assertIn("1 agents à réencoder", self.reencode('--retry-failed'))
+        self.assertEqual(self.staged(self.agent).status, ENROLLMENT_SUCCESS)
+        self.assertIsNotNone(self.staged(self.agent).encoding)
+        self.assertEqual(bytes(self.staged(self.other).encoding), self.sentinel)
+
+    def test_cutover_archives_previous_encoding(self):
+        previous = bytes(self.agent.face_encoding)
+        VersionedEncoding.objects.create(
+            agent=self.agent, version=self.new, encoding=self.sentinel, status=ENROLLMENT_SUCCESS
+        )
+        self.assertEqual(cutover(self.new), (1, 0))
+
+        self.agent.refresh_from_db()
+        self.assertEqual((bytes(self.agent.face_encoding), self.agent.face_encoding_version), (self.sentinel, self.new))
+        archived = VersionedEncoding.objects.get(agent=self.agent)
+        self.assertEqual((archived.version, bytes(archived.encoding)), (self.current, previous))
+
+        # L'index ne charge que la version des réglages courants : la nouvelle
+        # après le déploiement, l'archive en cas de retour arrière
+        with override_settings(FACE_ENCODING_JITTERS=2):
+            agent_ids, encodings = FaceEncodingIndex().snapshot()
+        self.assertEqual(agent_ids.tolist(), [self.agent.id])
+        np.testing.assert_allclose(encodings[0], unpack_encoding(self.sentinel))
+        agent_ids, encodings = FaceEncodingIndex().snapshot()
+        self.assertEqual(agent_ids.tolist(), [self.agent.id])
+        np.testing.assert_allclose(encodings[0], unpack_encoding(previous))
+
+
+class FaceEncodingIndexTests(TestCase):
+    """
+    Index local et génération partagée : les enregistrements d'agents passent
+    par l'index global face_index, comme le ferait un autre processus
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.encodings = random_encodings(2)
+        self.agent = self.create_agent('a1', self.encodings[0])
+
+    def create_agent(self, username, encoding):
+        agent = Agent(username=username, email=f'{username}@example.com', nom=username, role='qualité')
+        agent.set_face_encoding(encoding)
+        agent.save()
+        return agent
+
+    def test_change_during_load_triggers_reload(self):
+        index = FaceEncodingIndex()
+
+        def unpack_during_change(blob):
+            cache.incr(GENERATION_CACHE_KEY)
+            return unpack_encoding(blob)
+
+        with mock.patch('face_recognition_app.encoding_index.unpack_encoding', side_effect=unpack_during_change):
+            index.load()
+        with mock.patch.object(index, 'load', wraps=index.load) as load:
+            len(index)
+        load.assert_called_once()
+
+    def test_concurrent_change_is_not_lost(self):
+        index = FaceEncodingIndex()
+        self.assertEqual(len(index), 1)
+        self.create_agent('a2', self.encodings[1])
+        # Modification locale après celle de l'autre processus
+        index.update_agent(self.agent.id, self.encodings[:1])
+        self.assertEqual(len(index), 2)
+
+    def test_local_change_keeps_arrays(self):
+        index = FaceEncodingIndex()
+        self.assertEqual(len(index), 1)
+        index.update_agent(self.agent.id, self.encodings)
+        with mock.patch.object(index, 'load') as load:
+            self.assertEqual(index.search(self.encodings[1])[0], self.agent.id)
+        load.assert_not_called()
+
+
+class EncodingPoolTests(SimpleTestCase):
+    def test_cache_is_scoped_to_encoding_version(self):
+        calls = []
+
+        def job(item):
+            calls.append(item)
+            return len(item)
+
+        pool = EncodingPool(size=0)
+        cache = EncodingCache(max_bytes=1024 * 1024)
+        with override_settings(FACE_ENCODING_JITTERS=1):
+            list(pool.map(job, [b'photo'], cache=cache))
+            list(pool.map(job, [b'photo'], cache=cache))
+        self.assertEqual(len(calls), 1)
+        # Nouveaux paramètres : le résultat de l'ancienne version n'est pas repris
+        with override_settings(FACE_ENCODING_JITTERS=2):
+            (_, result, error), = pool.map(job, [b'photo'], cache=cache)
+        self.assertEqual((result, error), (5, None))
+        self.assertEqual(len(calls), 2)
+
+
+    def test_map_without_cache_accepts_partial(self):
+        # reencode_agents passe un functools.partial, sans __name__ ni cache
+        job = functools.partial(pow, exp=2)
+        self.assertEqual([result for _, result, _ in EncodingPool(size=0).map(job, [2, 3])], [4, 9])
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_default_size_is_shared_between_web_workers(self, _):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}):
+            self.assertEqual(default_pool_size(), 2)
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '16'}):
+            self.assertEqual(default_pool_size(), 1)
+        with mock.patch.dict(os.environ):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            self.assertEqual(default_pool_size(), 8)
+
+
+    @mock.patch('os.cpu_count', return_value=8)
+    def test_offline_commands_use_all_cores(self, _):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}), override_settings(FACE_ENCODING_POOL_SIZE=1):
+            for command, args in ((EnrollFaces, ['photos/']), (ReencodeFaces, [])):
+                options = command().create_parser('manage.py', 'command').parse_args(args)
+                self.assertEqual(options.workers, 8)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_shared_directory_sums_workers(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(FACE_METRICS_DIR=directory):
+            # Valeurs écrites par un autre worker
+            buckets = [0] * (len(metrics.request_duration.buckets) + 1)
+            buckets[-1] = 2
+            with open(os.path.join(directory, '1.json'), 'w') as f:
+                json.dump({
+                    metrics.outcomes.name: [[['metrics_test', 'success'], 2]],
+                    metrics.request_duration.name: [[['metrics_test'], buckets, 40.0, 2]],
+                }, f)
+            before = metrics.outcomes.value('metrics_test', 'success')
+            metrics.record_request('metrics_test', 0.02, {}, 'success')
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+
+            lines = metrics.render().splitlines()
+        self.assertIn(f'faceid_outcomes_total{{view="metrics_test",outcome="success"}} {before + 3:.1f}', lines)
+        self.assertIn(f'faceid_request_duration_seconds_count{{view="metrics_test"}} {before + 3}', lines)
+
+class TuneFaceToleranceTests(SimpleTestCase):
+    def test_block_counts_match_dense_distances(self):
+        rng = np.random.default_rng(0)
+        # Deux modèles pour certains agents : leurs paires ne sont pas des imposteurs
+        agent_ids = np.array([1, 1, 2, 3, 3, 4, 5, 6, 7])
+        encodings = rng.normal(scale=0.15, size=(len(agent_ids), 128)).astype(np.float32)
+        tolerances = np.round(np.arange(1.0, 2.5, 0.05), 4)
+
+        distances = [
+            np.linalg.norm(encodings[i] - encodings[j])
+            for i in range(len(agent_ids)) for j in range(i + 1, len(agent_ids))
+            if agent_ids[i] != agent_ids[j]
+        ]
+        expected = [sum(d <= t for d in distances) for t in tolerances]
+
+        for block_size in (1, 4, 1024):
+            accepted, total = TuneFaceTolerance()._impostor_counts(agent_ids, encodings, tolerances, block_size)
+            self.assertEqual(total, len(distances))
+            self.assertEqual(accepted.tolist(), expected)
@@ -0,0 +1,199 @@
+"""
+Réception des photos : base64 dans du JSON, multipart ou corps binaire brut
+
+Les bornes peuvent envoyer la photo telle quelle (Content-Type image/jpeg,
+autres champs en paramètres d'URL) ou en fichier multipart : pas de base64
+(+33 % de volume), pas de gros JSON à analyser. Les octets sont décodés
+directement par OpenCV (face_utils.decode_image_bytes).
+
+La taille est contrôlée avant tout décodage (FACE_UPLOAD_MAX_BYTES) : 413.
+Un corps JSON est borné avant son analyse à la taille base64 des photos
+attendues, plus une marge pour les autres champs.
+"""
+import io
+import json
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import BaseParser, FormParser, JSONParser, MultiPartParser
+
+# Clé de request.data pour un corps binaire brut
+RAW_IMAGE_KEY = '_raw_image'
+
+# Marge d'un corps JSON au-delà des photos en base64 (autres champs, espaces)
+JSON_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Photo trop volumineuse."
+    default_code = 'upload_too_large'
+
+
+def upload_max_bytes():
+    return getattr(settings, 'FACE_UPLOAD_MAX_BYTES', 5 * 1024 * 1024)
+
+
+def check_upload_size(size):
+    """
+    Lève UploadTooLarge si `size` octets dépassent FACE_UPLOAD_MAX_BYTES
+    """
+    max_bytes = upload_max_bytes()
+    if max_bytes and size > max_bytes:
+        raise UploadTooLarge(f"Photo trop volumineuse ({size} octets, {max_bytes} maximum).")
+
+
+class RawImageParser(BaseParser):
+    """
+    Corps de requête image/* : les octets de la photo, lus une seule fois
+    """
+    media_type = 'image/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        check_upload_size(int(request.META.get('CONTENT_LENGTH') or 0))
+        return {RAW_IMAGE_KEY: read_limited(stream)}
+
+
+def read_limited(stream, max_bytes=None, check=check_upload_size):
+    """
+    Lit le corps sans dépasser la limite (Content-Length absent ou inexact)
+
+    max_bytes : FACE_UPLOAD_MAX_BYTES par défaut ; check : contrôle de taille
+    """
+    if max_bytes is None:
+        max_bytes = upload_max_bytes()
+    data = stream.read(max_bytes + 1) if max_bytes else stream.read()
+    check(len(data))
+    return data
+
+
+def json_max_bytes(photos=1):
+    """
+    Taille max d'un corps JSON portant `photos` photos en base64 (None : illimitée)
+    """
+    max_bytes = upload_max_bytes()
+    if not max_bytes:
+        return None
+    # 4 caractères base64 pour 3 octets, arrondi au bloc supérieur
+    return photos * 4 * -(-max_bytes // 3) + JSON_OVERHEAD_BYTES
+
+
+def check_json_size(size, photos=1):
+    """
+    Lève UploadTooLarge si un corps JSON de `size` octets dépasse json_max_bytes
+    """
+    max_bytes = json_max_bytes(photos)
+    if max_bytes and size > max_bytes:
+        raise UploadTooLarge(f"Requête trop volumineuse ({size} octets, {max_bytes} maximum).")
+
+
+def read_json_limited(stream, photos=1):
+    """
+    Lit un corps JSON borné à json_max_bytes, avant toute analyse
+    """
+    return read_limited(stream, json_max_bytes(photos) or 0, lambda size: check_json_size(size, photos))
+
+
+class PhotoJSONParser(JSONParser):
+    """
+    JSONParser borné : Content-Length puis lecture limitée, comme
+    RawImageParser, avant d'analyser le corps (photo en base64)
+    """
+    def photos(self):
+        return 1
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        photos = self.photos()
+        check_json_size(int(request.META.get('CONTENT_LENGTH') or 0), photos)
+        body = io.BytesIO(read_json_limited(stream, photos))
+        return super().parse(body, media_type, parser_context)
+
+
+class BurstJSONParser(PhotoJSONParser):
+    """
+    PhotoJSONParser pour une rafale : jusqu'à FACE_BURST_MAX_FRAMES photos
+    """
+    def photos(self):
+        return getattr(settings, 'FACE_BURST_MAX_FRAMES', 5)
+
+
+# Parseurs des vues qui reçoivent une photo
+PHOTO_PARSERS = [PhotoJSONParser, MultiPartParser, FormParser, RawImageParser]
+
+# Parseurs des vues qui reçoivent une rafale de photos
+BURST_PARSERS = [BurstJSONParser, MultiPartParser, FormParser, RawImageParser]
+
+
+def image_payload(data, files, query_params, field):
+    """
+    Données de la requête avec la photo sous `field` : octets (binaire brut
+    ou multipart) ou chaîne base64 (JSON), taille déjà contrôlée
+    """
+    if RAW_IMAGE_KEY in data:
+        payload = query_params.dict()
+        payload[field] = data[RAW_IMAGE_KEY]
+        return payload
+
+    payload = data.dict() if hasattr(data, 'dict') else dict(data)
+    upload = files.get(field)
+    if upload is not None:
+        check_upload_size(upload.size)
+        payload[field] = upload.read()
+    elif isinstance(payload.get(field), str):
+        # Taille décodée d'une chaîne base64 : 3 octets pour 4 caractères
+        check_upload_size(len(payload[field]) * 3 // 4)
+    return payload
+
+
+def request_image_payload(request, field):
+    """
+    image_payload pour une requête DRF
+    """
+    return image_payload(request.data, request.FILES, request.query_params, field)
+
+
+def burst_image_payload(data, files, field):
+    """
+    Données de la requête avec les captures d'une rafale sous `field` : liste
+    d'octets (fichiers multipart répétés) ou de chaînes base64 (JSON),
+    taille de chaque capture déjà contrôlée
+    """
+    payload = data.dict() if hasattr(data, 'dict') else dict(data)
+    uploads = files.getlist(field)
+    if uploads:
+        for upload in uploads:
+            check_upload_size(upload.size)
+        payload[field] = [upload.read() for upload in uploads]
+    elif isinstance(payload.get(field), list):
+        for frame in payload[field]:
+            if isinstance(frame, str):
+                check_upload_size(len(frame) * 3 // 4)
+    return payload
+
+
+def request_burst_payload(request, field):
+    """
+    burst_image_payload pour une requête DRF
+    """
+    return burst_image_payload(request.data, request.FILES, field)
+
+
+def django_image_payload(request, field):
+    """
+    image_payload pour une requête Django (vues asynchrones, sans parseurs DRF)
+
+    Lève ValueError si le corps JSON est invalide.
+    """
+    content_type = request.content_type or ''
+    if content_type.startswith('image/'):
+        check_upload_size(int(request.META.get('CONTENT_LENGTH') or 0))
+        data = {RAW_IMAGE_KEY: read_limited(request)}
+    elif content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        data = request.POST
+    else:
+        check_json_size(int(request.META.get('CONTENT_LENGTH') or 0))
+        data = json.loads(read_json_limited(request))
+    return image_payload(data, request.FILES, request.GET, field)
@@ -1,7 +1,12 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     path('verify/', views.verify_face_id, name='verify-face-id'),
+    path('verify-async/', async_views.verify_face_id_async, name='verify-face-id-async'),
+    path('verify-burst/', views.verify_face_burst, name='verify-face-burst'),
+    path('identify/', views.identify_face, name='identify-face'),
     path('upload-encoding/', views.upload_face_encoding, name='upload-face-encoding'),
+    path('bulk-upload-encodings/', views.bulk_upload_face_encodings, name='bulk-upload-face-encodings'),
+    path('metrics/', views.metrics_view, name='face-metrics'),
 ]
\ No newline at end of file
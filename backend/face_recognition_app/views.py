@@ -1,22 +1,222 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from django.http import HttpResponse
 from django.utils import timezone
 from agents.models import Agent
 from machines.models import Machine
 from interventions.models import Intervention
-from .serializers import FaceVerificationSerializer
-from .face_utils import encode_face_from_base64, compare_faces
-import json
+from django.conf import settings
+from functools import wraps
+from .serializers import FaceVerificationSerializer, FaceBurstVerificationSerializer, FaceIdentificationSerializer, BulkEnrollmentSerializer
+from .face_utils import encode_face_job, verify_burst_job, compare_faces_gallery, decode_base64_image, distance_to_confidence, encoding_version
+from .models import FaceTemplate, maybe_add_live_template
+from .agent_cache import get_agent_entry, get_machine_entry
+from .encoding_codec import pack_encoding
+from .enrollment import enroll_agents
+from collections import Counter
+from .encoding_cache import encoding_cache, image_key
+from .encoding_index import face_index
+from .encoding_pool import get_encoding_pool, EncodingQueueFull, EncodingTimeout
+from .quality import REJECTION_MESSAGES
+from .uploads import BURST_PARSERS, PHOTO_PARSERS, check_upload_size, request_burst_payload, request_image_payload
+from . import metrics
+from contextlib import contextmanager
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ROLE_PROBLEM_MAPPING = {
+    'matière': 'qualité',
+    'technique': 'maintenance',
+    'câblage': 'maintenance'
+}
+
+def is_role_authorized(role, problem_type):
+    """
+    Vérifie si le rôle de l'agent permet d'intervenir sur ce type de problème
+    """
+    return role == 'admin' or role == ROLE_PROBLEM_MAPPING.get(problem_type)
+
+def server_timing(timings):
+    """
+    Formate les durées par étape pour l'en-tête Server-Timing
+    """
+    return ', '.join(
+        f"{step};dur={duration * 1000:.1f}" for step, duration in timings.items()
+    )
+
+def default_outcome(status_code):
+    """
+    Résultat d'une requête pour les métriques quand la vue ne l'a pas précisé
+    """
+    if status_code < 400:
+        return 'success'
+    if status_code < 500:
+        return 'invalid_request'
+    return 'error'
+
+def report_timings(view):
+    """
+    Ajoute un en-tête Server-Timing avec la durée de chaque étape et
+    enregistre les métriques de la requête (durées, résultat)
+    
+    La vue renseigne request.face_timings et, si besoin, request.face_outcome.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.face_timings = {}
+        request.face_outcome = None
+        start = time.perf_counter()
+        response = view(request, *args, **kwargs)
+        metrics.record_request(
+            view.__name__,
+            time.perf_counter() - start,
+            request.face_timings,
+            request.face_outcome or default_outcome(response.status_code)
+        )
+        if request.face_timings:
+            response['Server-Timing'] = server_timing(request.face_timings)
+        return response
+    return wrapper
+
+@contextmanager
+def timed(timings, step):
+    """
+    Mesure la durée d'un bloc : with timed(request.face_timings, 'lookup'): ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = time.perf_counter() - start
+
+def live_photo_bytes(image):
+    """
+    Octets de la photo live (décodage du base64), ou None si le base64 est invalide
+    """
+    if not isinstance(image, str):
+        return image
+    try:
+        return decode_base64_image(image)
+    except ValueError as e:
+        logger.warning("Photo base64 invalide: %s", e)
+        return None
+
+def live_cache_key(image):
+    """
+    Clé du cache des encodages live (un changement de version ne reprend
+    jamais un encodage de l'ancienne)
+    """
+    return image_key(f'{encode_face_job.__name__}:{encoding_version()}', image)
+
+def encode_live_photo(request, image):
+    """
+    Encode la photo live dans le pool, ou reprend le résultat d'une image
+    identique déjà encodée (cache par contenu)
+    
+    Retourne (encodage ou None, motif de rejet ou None)
+    """
+    image = live_photo_bytes(image)
+    if image is None:
+        return None, None
+    
+    key = None
+    if encoding_cache.enabled:
+        with timed(request.face_timings, 'cache'):
+            key = live_cache_key(image)
+            cached = encoding_cache.get(key)
+        if cached is not None:
+            return cached
+    
+    # Attente dans la file comprise
+    with timed(request.face_timings, 'pool'):
+        encoding, timings, rejection = get_encoding_pool().run(encode_face_job, image)
+    request.face_timings.update(timings)
+    if key is not None:
+        encoding_cache.set(key, (encoding, rejection))
+    return encoding, rejection
+
+VERIFICATION_RESULTS = {
+    'success': (status.HTTP_200_OK, "Vérification réussie, accès autorisé."),
+    'inactive': (status.HTTP_403_FORBIDDEN, "Compte désactivé."),
+    'role_denied': (status.HTTP_403_FORBIDDEN, None),
+    'no_face': (status.HTTP_400_BAD_REQUEST, "Aucun visage détecté dans la photo. Veuillez réessayer."),
+    'no_reference': (status.HTTP_400_BAD_REQUEST, "Aucun encodage de référence trouvé pour cet agent."),
+    'mismatch': (status.HTTP_403_FORBIDDEN, "Le visage ne correspond pas à la référence."),
+    'not_found': (status.HTTP_404_NOT_FOUND, None),
+    'overloaded': (status.HTTP_503_SERVICE_UNAVAILABLE, "Service de reconnaissance saturé. Veuillez réessayer dans un instant."),
+    'timeout': (status.HTTP_503_SERVICE_UNAVAILABLE, "Délai de reconnaissance dépassé. Veuillez réessayer."),
+    'error': (status.HTTP_500_INTERNAL_SERVER_ERROR, None),
+}
+
+def verification_result(request, outcome, message=None, **data):
+    """
+    Corps, statut HTTP et en-têtes de la réponse de vérification pour un
+    résultat (clé de VERIFICATION_RESULTS ou motif de rejet qualité)
+    
+    Partagé par les vues synchrones et asynchrone ; renseigne request.face_outcome.
+    """
+    request.face_outcome = outcome
+    if outcome in REJECTION_MESSAGES:
+        status_code, default_message = status.HTTP_400_BAD_REQUEST, REJECTION_MESSAGES[outcome]
+        data['rejection'] = outcome
+    else:
+        status_code, default_message = VERIFICATION_RESULTS[outcome]
+    payload = {
+        'is_match': outcome == 'success',
+        'is_authorized': outcome == 'success',
+        'message': message or default_message,
+    }
+    payload.update(data)
+    headers = {'Retry-After': '1'} if outcome == 'overloaded' else None
+    return payload, status_code, headers
+
+def agent_refusal(request, agent, problem_type):
+    """
+    Résultat de vérification si l'agent ne peut pas intervenir (compte
+    désactivé, rôle non autorisé), sinon None
+    """
+    if not agent['is_active']:
+        return verification_result(request, 'inactive')
+    if not is_role_authorized(agent['role'], problem_type):
+        return verification_result(
+            request, 'role_denied',
+            f"Accès refusé. Le rôle '{agent['role']}' n'est pas autorisé pour un problème de type '{problem_type}'."
+        )
+    return None
+
+def verification_error(request, error):
+    """
+    Résultat de vérification pour une exception levée pendant la vérification
+    (à appeler dans le bloc except)
+    """
+    if isinstance(error, Agent.DoesNotExist):
+        return verification_result(request, 'not_found', "Agent non trouvé.")
+    if isinstance(error, Machine.DoesNotExist):
+        return verification_result(request, 'not_found', "Machine non trouvée.")
+    if isinstance(error, EncodingQueueFull):
+        return verification_result(request, 'overloaded')
+    if isinstance(error, EncodingTimeout):
+        return verification_result(request, 'timeout')
+    logger.exception("Erreur lors de la vérification Face ID")
+    return verification_result(request, 'error', f"Erreur technique: {str(error)}")
+
+def verification_response(result):
+    payload, status_code, headers = result
+    return Response(payload, status=status_code, headers=headers)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@parser_classes(PHOTO_PARSERS)
+@report_timings
 def verify_face_id(request):
     """
     Vérifie l'identité via Face ID et autorise l'accès à la machine
     """
-    serializer = FaceVerificationSerializer(data=request.data)
+    serializer = FaceVerificationSerializer(data=request_image_payload(request, 'live_photo'))
     
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -28,102 +228,243 @@ def verify_face_id(request):
     machine_id = data['machine_id']
     
     try:
-        # Récupérer l'agent et la machine
-        agent = Agent.objects.get(id=agent_id)
-        machine = Machine.objects.get(id=machine_id)
+        # Récupérer l'agent et la machine (cache, sans accès base en régime établi)
+        with timed(request.face_timings, 'lookup'):
+            agent = get_agent_entry(agent_id)
+            get_machine_entry(machine_id)
         
-        # Vérifier si l'agent a le bon rôle pour le type de problème
-        role_problem_mapping = {
-            'matière': 'qualité',
-            'technique': 'maintenance',
-            'câblage': 'maintenance'
-        }
-        
-        required_role = role_problem_mapping.get(problem_type)
-        if agent.role != required_role and agent.role != 'admin':
-            return Response({
-                'is_match': False,
-                'is_authorized': False,
-                'message': f"Accès refusé. Le rôle '{agent.role}' n'est pas autorisé pour un problème de type '{problem_type}'."
-            }, status=status.HTTP_403_FORBIDDEN)
+        # Compte actif et rôle autorisé pour le type de problème
+        refusal = agent_refusal(request, agent, problem_type)
+        if refusal:
+            return verification_response(refusal)
         
         # Encoder le visage de la photo live
-        live_encoding = encode_face_from_base64(live_photo)
+        live_encoding, rejection = encode_live_photo(request, live_photo)
+        if rejection:
+            return verification_response(verification_result(request, rejection))
         if not live_encoding:
-            return Response({
-                'is_match': False,
-                'is_authorized': False,
-                'message': "Aucun visage détecté dans la photo. Veuillez réessayer."
-            }, status=status.HTTP_400_BAD_REQUEST)
+            return verification_response(verification_result(request, 'no_face'))
         
-        # Récupérer l'encodage de référence de l'agent
-        if not agent.face_encoding:
-            return Response({
-                'is_match': False,
-                'is_authorized': False,
-                'message': "Aucun encodage de référence trouvé pour cet agent."
-            }, status=status.HTTP_400_BAD_REQUEST)
+        # Récupérer la galerie de référence de l'agent
+        gallery = agent['gallery']
+        if gallery is None:
+            return verification_response(verification_result(request, 'no_reference'))
         
-        reference_encoding = json.loads(agent.face_encoding)
+        # Comparer le visage à tous les modèles de l'agent
+        is_match, distance = compare_faces_gallery(gallery, live_encoding, timings=request.face_timings)
+        confidence = distance_to_confidence(distance)
         
-        # Comparer les visages
-        is_match = compare_faces(reference_encoding, live_encoding)
+        if not is_match:
+            return verification_response(verification_result(
+                request, 'mismatch', distance=distance, confidence=confidence
+            ))
         
-        if is_match:
-            # Créer une nouvelle intervention
+        # Créer une nouvelle intervention
+        with timed(request.face_timings, 'intervention'):
             intervention = Intervention.objects.create(
-                machine=machine,
-                agent=agent,
+                machine_id=machine_id,
+                agent_id=agent_id,
                 type_probleme=problem_type,
                 statut='résolu',
                 date_deverrouillage=timezone.now(),
-                description=f"Accès autorisé via Face ID pour problème {problem_type}"
+                description=f"Accès autorisé via Face ID pour problème {problem_type}",
+                match_distance=distance,
+                match_confidence=confidence
             )
-            
+        
+        maybe_add_live_template(agent_id, live_encoding, distance)
+        
+        return verification_response(verification_result(
+            request, 'success', intervention_id=intervention.id, distance=distance, confidence=confidence
+        ))
+    
+    except Exception as e:
+        return verification_response(verification_error(request, e))
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@parser_classes(BURST_PARSERS)
+@report_timings
+def verify_face_burst(request):
+    """
+    Vérifie l'identité à partir d'une rafale de captures (live_photos)
+    
+    Les captures sont notées à bas coût puis encodées de la plus nette à la
+    moins nette jusqu'à la première reconnue (face_utils.verify_burst_job) :
+    un clignement ou un flou de bougé ne coûte pas un nouvel aller-retour.
+    La réponse indique la capture reconnue (frame), le résultat de chaque
+    capture (frames) et le travail effectué (work).
+    """
+    serializer = FaceBurstVerificationSerializer(data=request_burst_payload(request, 'live_photos'))
+    
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    frames = data['live_photos']
+    agent_id = data['agent_id']
+    problem_type = data['problem_type']
+    machine_id = data['machine_id']
+    
+    try:
+        with timed(request.face_timings, 'lookup'):
+            agent = get_agent_entry(agent_id)
+            get_machine_entry(machine_id)
+        
+        refusal = agent_refusal(request, agent, problem_type)
+        if refusal:
+            return verification_response(refusal)
+        
+        # Sans référence, inutile d'encoder la rafale
+        gallery = agent['gallery']
+        if gallery is None:
+            return verification_response(verification_result(request, 'no_reference'))
+        
+        # Notation, encodage et comparaison dans le pool (attente dans la file comprise)
+        with timed(request.face_timings, 'pool'):
+            result = get_encoding_pool().run(verify_burst_job, frames, gallery)
+        request.face_timings.update(result['timings'])
+        work = result['work']
+        metrics.burst_frames.inc('received', amount=work['frames'])
+        metrics.burst_frames.inc('detected', amount=work['detected'])
+        metrics.burst_frames.inc('encoded', amount=work['encoded'])
+        
+        details = {'frames': result['frames'], 'work': work}
+        if work['encoded'] == 0:
+            rejection = result['rejection']
+            if rejection:
+                return verification_response(verification_result(request, rejection, **details))
+            return verification_response(verification_result(
+                request, 'no_face', "Aucun visage détecté dans les captures. Veuillez réessayer.",
+                rejection=None, **details
+            ))
+        
+        distance = result['distance']
+        confidence = distance_to_confidence(distance)
+        if result['frame'] is None:
+            return verification_response(verification_result(
+                request, 'mismatch', distance=distance, confidence=confidence, **details
+            ))
+        
+        with timed(request.face_timings, 'intervention'):
+            intervention = Intervention.objects.create(
+                machine_id=machine_id,
+                agent_id=agent_id,
+                type_probleme=problem_type,
+                statut='résolu',
+                date_deverrouillage=timezone.now(),
+                description=f"Accès autorisé via Face ID pour problème {problem_type}",
+                match_distance=distance,
+                match_confidence=confidence
+            )
+        
+        maybe_add_live_template(agent_id, result['encoding'], distance)
+        
+        return verification_response(verification_result(
+            request, 'success', intervention_id=intervention.id, distance=distance,
+            confidence=confidence, frame=result['frame'], **details
+        ))
+    
+    except Exception as e:
+        return verification_response(verification_error(request, e))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes(PHOTO_PARSERS)
+@report_timings
+def identify_face(request):
+    """
+    Identifie l'agent correspondant à la photo live (recherche 1:N)
+    
+    Réservé aux utilisateurs authentifiés ; seuls l'id, le nom et le rôle de
+    l'agent sont renvoyés (ni identifiant de connexion ni email).
+    """
+    serializer = FaceIdentificationSerializer(data=request_image_payload(request, 'live_photo'))
+
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        live_encoding, rejection = encode_live_photo(request, serializer.validated_data['live_photo'])
+        if rejection:
+            request.face_outcome = rejection
             return Response({
-                'is_match': True,
-                'is_authorized': True,
-                'message': "Vérification réussie, accès autorisé.",
-                'intervention_id': intervention.id
-            })
-        else:
+                'is_match': False,
+                'rejection': rejection,
+                'message': REJECTION_MESSAGES[rejection]
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not live_encoding:
+            request.face_outcome = 'no_face'
             return Response({
                 'is_match': False,
-                'is_authorized': False,
-                'message': "Le visage ne correspond pas à la référence."
-            }, status=status.HTTP_403_FORBIDDEN)
-            
+                'message': "Aucun visage détecté dans la photo. Veuillez réessayer."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        with timed(request.face_timings, 'search'):
+            agent_id, distance = face_index.search(live_encoding)
+        tolerance = getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6)
+
+        if agent_id is None or distance > tolerance:
+            request.face_outcome = 'mismatch'
+            return Response({
+                'is_match': False,
+                'message': "Aucun agent ne correspond à ce visage."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        agent = get_agent_entry(agent_id)
+
+        return Response({
+            'is_match': True,
+            'message': "Agent identifié.",
+            'agent': {'id': agent['id'], 'nom': agent['nom'], 'role': agent['role']},
+            'distance': distance,
+            'confidence': distance_to_confidence(distance)
+        })
+
     except Agent.DoesNotExist:
+        request.face_outcome = 'not_found'
+        face_index.invalidate()
         return Response({
             'is_match': False,
-            'is_authorized': False,
             'message': "Agent non trouvé."
         }, status=status.HTTP_404_NOT_FOUND)
-    
-    except Machine.DoesNotExist:
+
+    except EncodingQueueFull:
+        request.face_outcome = 'overloaded'
         return Response({
             'is_match': False,
-            'is_authorized': False,
-            'message': "Machine non trouvée."
-        }, status=status.HTTP_404_NOT_FOUND)
-    
+            'message': "Service de reconnaissance saturé. Veuillez réessayer dans un instant."
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+    except EncodingTimeout:
+        request.face_outcome = 'timeout'
+        return Response({
+            'is_match': False,
+            'message': "Délai de reconnaissance dépassé. Veuillez réessayer."
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
     except Exception as e:
+        logger.exception("Erreur lors de l'identification Face ID")
         return Response({
             'is_match': False,
-            'is_authorized': False,
             'message': f"Erreur technique: {str(e)}"
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@parser_classes(PHOTO_PARSERS)
+@report_timings
 def upload_face_encoding(request):
     """
     Upload et encode une photo de référence pour un agent
     """
-    agent_id = request.data.get('agent_id')
-    photo_base64 = request.data.get('photo')
+    data = request_image_payload(request, 'photo')
+    agent_id = data.get('agent_id')
+    photo = data.get('photo')
+    # Ajouter la photo à la galerie au lieu de remplacer la référence principale
+    add_template = data.get('add_template') in (True, 'true', '1')
     
-    if not agent_id or not photo_base64:
+    if not agent_id or not photo:
         return Response({
             'error': 'agent_id et photo requis'
         }, status=status.HTTP_400_BAD_REQUEST)
@@ -132,16 +473,28 @@ def upload_face_encoding(request):
         agent = Agent.objects.get(id=agent_id)
         
         # Encoder le visage
-        face_encoding = encode_face_from_base64(photo_base64)
+        face_encoding, rejection = encode_live_photo(request, photo)
         
+        if rejection:
+            request.face_outcome = rejection
+            return Response({
+                'error': REJECTION_MESSAGES[rejection],
+                'rejection': rejection
+            }, status=status.HTTP_400_BAD_REQUEST)
         if face_encoding:
-            agent.face_encoding = json.dumps(face_encoding)
-            agent.save()
+            if add_template:
+                FaceTemplate.objects.create(
+                    agent=agent, encoding=pack_encoding(face_encoding), version=encoding_version()
+                )
+            else:
+                agent.set_face_encoding(face_encoding)
+                agent.save(update_fields=['face_encoding', 'face_encoding_version', 'updated_at'])
             
             return Response({
                 'message': 'Encodage du visage sauvegardé avec succès'
             })
         else:
+            request.face_outcome = 'no_face'
             return Response({
                 'error': 'Aucun visage détecté dans la photo'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -150,7 +503,78 @@ def upload_face_encoding(request):
         return Response({
             'error': 'Agent non trouvé'
         }, status=status.HTTP_404_NOT_FOUND)
+    except EncodingQueueFull:
+        request.face_outcome = 'overloaded'
+        return Response({
+            'error': "Service de reconnaissance saturé, réessayez dans un instant"
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+    except EncodingTimeout:
+        request.face_outcome = 'timeout'
+        return Response({
+            'error': "Délai d'encodage dépassé"
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        logger.exception("Erreur lors de l'enregistrement de l'encodage")
+        return Response({
+            'error': f'Erreur technique: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_upload_face_encodings(request):
+    """
+    Enrôle plusieurs agents en une requête, encodage en parallèle
+    
+    Réservé aux administrateurs : remplace la référence de n'importe quel agent.
+    """
+    if request.user.role != 'admin':
+        return Response({
+            'error': "Enrôlement en masse réservé aux administrateurs."
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = BulkEnrollmentSerializer(data=request.data)
+
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    items = serializer.validated_data['items']
+    # Taille de chaque photo contrôlée avant tout décodage (4 caractères base64 pour 3 octets) : 413
+    for item in items:
+        check_upload_size(len(item['photo']) * 3 // 4)
+
+    try:
+        agents = Agent.objects.in_bulk([item['agent_id'] for item in items])
+        entries = []
+        for item in items:
+            try:
+                photo = decode_base64_image(item['photo'])
+            except ValueError:
+                photo = b''
+            entries.append((item['agent_id'], agents.get(item['agent_id']), photo))
+
+        report = enroll_agents(entries, get_encoding_pool())
+
+        return Response({
+            'summary': Counter(entry['status'] for entry in report),
+            'results': [
+                {'agent_id': entry['key'], 'status': entry['status'], 'error': entry.get('error')}
+                for entry in report
+            ]
+        })
+
     except Exception as e:
+        logger.exception("Erreur lors de l'enrôlement en masse")
         return Response({
             'error': f'Erreur technique: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def metrics_view(request):
+    """
+    Expose les métriques au format texte Prometheus
+    
+    Si FACE_METRICS_TOKEN est défini, l'en-tête Authorization: Bearer <jeton> est exigé.
+    """
+    token = getattr(settings, 'FACE_METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,16 @@
+"""
+ASGI config for faceid_factory project.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'faceid_factory.settings')
+
+application = get_asgi_application()
+
+# Modèles de reconnaissance faciale chargés au démarrage du worker (FACE_WARMUP)
+from face_recognition_app.encoding_pool import warm_up_encoding  # noqa: E402
+
+warm_up_encoding()
@@ -0,0 +1,124 @@
+"""
+Diffusion d'événements temps réel (verrouillage des machines) vers les clients SSE
+
+Les signaux Django publient des événements sur des canaux ('machines' pour
+tous, 'machine:<id>' pour une machine) ; chaque connexion SSE s'abonne aux
+canaux qui l'intéressent et reçoit les événements dans une file asyncio.
+
+Le broker est choisi par le réglage EVENTS_BACKEND (chemin pointé). Le broker
+par défaut, en mémoire, ne relie que les clients du même processus : avec
+plusieurs workers ASGI, fournir un backend partagé (ex: Redis pub/sub)
+implémentant publish() et subscribe().
+"""
+import asyncio
+import itertools
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+ALL_MACHINES = 'machines'
+
+
+def machine_channel(machine_id):
+    return f'machine:{machine_id}'
+
+
+class Subscription:
+    """
+    Abonnement d'une connexion : file bornée d'événements sur sa boucle asyncio
+
+    Si le client ne suit pas (file pleine), les événements suivants sont
+    abandonnés et un événement 'resync' lui demande de recharger l'état.
+    """
+
+    def __init__(self, broker, channels, max_queue=100):
+        self.broker = broker
+        self.channels = set(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def _deliver(self, event):
+        # Exécuté sur la boucle de l'abonné
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def push(self, event):
+        """
+        Remet un événement à l'abonné, depuis n'importe quel thread
+        """
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # Boucle fermée : la connexion est terminée
+            self.close()
+
+    async def get(self):
+        if self.overflowed and self.queue.empty():
+            self.overflowed = False
+            return {'type': 'resync'}
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Broker en mémoire, propre au processus
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, channels, event):
+        """
+        Publie un événement (dict sérialisable en JSON) sur un ou plusieurs canaux
+        """
+        channels = set(channels)
+        event = dict(event, id=next(self._ids))
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.channels & channels]
+        for subscription in targets:
+            subscription.push(event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Retourne le broker du processus, selon EVENTS_BACKEND
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'EVENTS_BACKEND', 'faceid_factory.events.InProcessBroker')
+                _broker = import_string(backend)()
+    return _broker
+
+
+def publish_machine_event(machine_id, event):
+    """
+    Publie un événement concernant une machine (canal de la machine et canal global)
+    """
+    get_broker().publish([machine_channel(machine_id), ALL_MACHINES], dict(event, machine_id=machine_id))
@@ -0,0 +1,167 @@
+"""
+Pagination des listes de l'API
+
+Par défaut, pagination par numéro de page (?page=N) comme auparavant.
+Avec ?pagination=cursor (ou dès qu'un ?cursor=... est fourni), pagination
+par curseur (keyset) : pas de COUNT(*) ni d'OFFSET, chaque page est lue
+à partir de la position de la précédente, en temps constant quelle que
+soit la profondeur. Les liens next/previous conservent ce mode.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par clé composite : le curseur porte les valeurs de toutes les
+    clés de tri de la dernière ligne (ex: date_blocage et id), et la page
+    suivante est filtrée par comparaison lexicographique, par exemple
+    Q(date_blocage__lt=d) | Q(date_blocage=d, id__lt=i)
+
+    Les lignes de même date sont départagées par l'id, sans OFFSET : un
+    index (..., -date_blocage) sert la recherche, et des insertions entre
+    deux pages ne font ni sauter ni répéter de lignes.
+
+    ordering : champs du modèle (non nuls), terminés par une clé unique (id)
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    ordering = ('id',)
+    invalid_cursor_message = "Curseur invalide."
+
+    def __init__(self, ordering=None, page_size=None, cursor_query_param=None):
+        self.ordering = tuple(ordering or self.ordering)
+        self.page_size = page_size or self.page_size
+        self.cursor_query_param = cursor_query_param or self.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            # Page précédente : parcours dans l'ordre inverse, puis remise à l'endroit
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        first = self.position(rows[0]) if rows else position
+        last = self.position(rows[-1]) if rows else position
+        if reverse:
+            self.previous_position = first if has_more else None
+            self.next_position = last
+        else:
+            self.previous_position = first if position is not None else None
+            self.next_position = last if has_more else None
+        return rows
+
+    def after(self, position, reverse=False):
+        """
+        Lignes situées après `position` dans l'ordre de tri (avant si reverse)
+        """
+        conditions = []
+        for index, (field, descending) in enumerate(zip(self.fields, self.descending)):
+            lookup = 'lt' if descending != reverse else 'gt'
+            equal = {f.attname: value for f, value in zip(self.fields[:index], position[:index])}
+            conditions.append(Q(**equal, **{f'{field.attname}__{lookup}': position[index]}))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def position(self, instance):
+        return [field.value_from_object(instance) for field in self.fields]
+
+    def encode_cursor(self, position, reverse):
+        if position is None:
+            return None
+        values = [field.value_to_string(_Row(field, value)) for field, value in zip(self.fields, position)]
+        cursor = base64.urlsafe_b64encode(json.dumps({'v': values, 'r': reverse}).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = data['v']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return position, bool(data.get('r'))
+        except (binascii.Error, TypeError, KeyError, ValueError, ValidationError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_position, False)
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.previous_position, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class _Row:
+    """
+    Objet minimal pour Field.value_to_string (sérialisation d'une valeur isolée)
+    """
+
+    def __init__(self, field, value):
+        setattr(self, field.attname, value)
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Pagination par numéro de page, ou par curseur sur demande du client
+
+    ordering : ordre du curseur, terminé par une clé unique (id)
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    ordering = ('id',)
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = KeysetPagination(self.ordering, self.page_size, self.cursor_query_param)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class InterventionPagination(OptInCursorPagination):
+    # Plus récentes d'abord ; l'id départage les interventions de même date
+    ordering = ('-date_blocage', '-id')
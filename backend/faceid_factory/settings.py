@@ -63,6 +63,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'faceid_factory.wsgi.application'
+ASGI_APPLICATION = 'faceid_factory.asgi.application'
 
 # Database
 DATABASES = {
@@ -95,6 +96,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'agents.hashers.KioskPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+KIOSK_ROLES = ['qualité', 'maintenance']  # Comptes opérateurs connectés depuis les postes de l'atelier
+KIOSK_PASSWORD_ITERATIONS = 100000  # Coût PBKDF2 des comptes kiosque (600000 par défaut pour les autres)
+
+AUTHENTICATION_BACKENDS = [
+    'agents.backends.EmailBackend',  # Login de l'API par email
+    'django.contrib.auth.backends.ModelBackend',  # Admin Django par nom d'utilisateur
+]
+
 # Internationalization
 LANGUAGE_CODE = 'fr-fr'
 TIME_ZONE = 'Europe/Paris'
@@ -109,13 +126,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Custom user model
+AUTH_USER_MODEL = 'agents.Agent'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'agents.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -130,7 +150,9 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_USER_CLASS': 'agents.authentication.AgentTokenUser',
 }
+AUTH_STATE_CACHE_TIMEOUT = 60  # Secondes ; révocation immédiate dans le processus, bornée par ce délai entre workers sans cache partagé
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
@@ -142,4 +164,89 @@ CORS_ALLOW_CREDENTIALS = True
 
 # Face recognition settings
 FACE_RECOGNITION_TOLERANCE = 0.6
-FACE_ENCODINGS_DIR = os.path.join(MEDIA_ROOT, 'face_encodings')
\ No newline at end of file
+FACE_ENCODINGS_DIR = os.path.join(MEDIA_ROOT, 'face_encodings')
+FACE_ENCODING_DTYPE = 'float32'  # Stockage binaire des encodages: 'float32' ou 'float64'
+
+# Pool de processus d'encodage des visages
+# Chaque worker HTTP crée son propre pool : N workers × FACE_ENCODING_POOL_SIZE processus
+# au total. None = cœurs ÷ WEB_CONCURRENCY (variable d'environnement, nombre de workers
+# gunicorn/uvicorn) ; à définir explicitement si les workers sont fixés autrement (--workers)
+FACE_ENCODING_POOL_SIZE = None  # 0 = encodage dans le worker HTTP
+FACE_ENCODING_QUEUE_SIZE = 32  # Travaux en attente au-delà desquels l'API répond 503
+FACE_ENCODING_TIMEOUT = 10  # Secondes
+FACE_WARMUP = True  # Charge les modèles dlib au démarrage des workers (wsgi/asgi) plutôt qu'à la première requête
+FACE_ENCODING_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Cache des encodages par contenu d'image, par processus (0 = désactivé)
+FACE_ENCODING_CACHE_TIMEOUT = 300  # Secondes
+
+# Prétraitement des photos avant détection
+FACE_DETECTION_MAX_SIDE = 640  # Côté max de l'image de détection (None = pleine résolution)
+FACE_DETECTION_UPSAMPLE = 1  # Suréchantillonnages de la détection (petits visages)
+FACE_DETECTION_MODEL = 'hog'  # 'hog' (CPU) ou 'cnn' (plus précis, GPU conseillé)
+FACE_ENCODING_JITTERS = 1  # Tirages moyennés par embedding (plus lent, un peu plus stable)
+# Changer l'un de ces trois réglages change la version des encodages : réencoder
+# les agents au préalable (manage.py reencode_faces)
+
+# Contrôle qualité des captures live (avant l'embedding)
+FACE_QUALITY_CHECKS = True  # Rejette les captures inexploitables avant l'embedding
+FACE_QUALITY_BRIGHTNESS_RANGE = (40, 220)  # Luminosité moyenne acceptée (0-255)
+FACE_QUALITY_MIN_FACE_SIZE = 80  # Côté minimal du visage, en pixels de l'image d'origine
+FACE_QUALITY_MAX_FACES = 1  # Visages de taille suffisante tolérés dans le champ
+FACE_QUALITY_MIN_SHARPNESS = 15  # Variance du laplacien sur le visage normalisé (flou en dessous)
+
+FACE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024  # Taille max d'une photo (binaire, multipart ou base64 décodé), 413 au-delà
+FACE_BULK_ENROLLMENT_MAX_ITEMS = 200  # Photos max par requête d'enrôlement en masse
+FACE_BURST_MAX_FRAMES = 5  # Captures max par rafale (verify-burst), chacune limitée à FACE_UPLOAD_MAX_BYTES
+
+# Galeries de modèles par agent
+FACE_MATCH_STRATEGY = 'min'  # Distance à la galerie: 'min' ou 'mean'
+FACE_TEMPLATE_MAX_PER_AGENT = 5
+FACE_TEMPLATE_AUTO_ADD_DISTANCE = None  # Ex: 0.35 pour ajouter les captures live très sûres (None = désactivé)
+FACE_TEMPLATE_AUTO_ADD_INTERVAL_HOURS = 24  # Au plus une capture ajoutée par agent sur cet intervalle
+
+# Cache des agents et machines pour la vérification Face ID
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'faceid-factory',
+    }
+    # Pour partager le cache entre workers, par exemple :
+    # 'default': {
+    #     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    #     'LOCATION': 'redis://127.0.0.1:6379',
+    # }
+}
+FACE_CACHE_ALIAS = 'default'
+FACE_CACHE_TIMEOUT = 300  # Secondes
+
+# Métriques Prometheus (/api/face-recognition/metrics/)
+FACE_METRICS_TOKEN = None  # Si défini, exige l'en-tête Authorization: Bearer <jeton>
+FACE_METRICS_DIR = None  # Dossier partagé par les workers d'un serveur, vidé au déploiement (requis avec plusieurs workers : sinon chaque collecte ne voit qu'un worker)
+
+# Journalisation
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {name}: {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'face_recognition_app': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+# Événements temps réel (SSE, /api/machines/events/) : nécessite un serveur ASGI
+EVENTS_BACKEND = 'faceid_factory.events.InProcessBroker'  # Broker partagé (ex: Redis) pour plusieurs workers
+EVENTS_KEEPALIVE = 15  # Secondes entre deux commentaires de maintien de connexion
+EVENTS_MAX_DURATION = 300  # Secondes avant fermeture du flux (le navigateur se reconnecte)
@@ -8,4 +8,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'faceid_factory.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Modèles de reconnaissance faciale chargés au démarrage du worker (FACE_WARMUP)
+from face_recognition_app.encoding_pool import warm_up_encoding  # noqa: E402
+
+warm_up_encoding()
@@ -1,10 +1,24 @@
 from django.contrib import admin
-from .models import Intervention
+from .models import Intervention, InterventionDailyStats
 
 @admin.register(Intervention)
 class InterventionAdmin(admin.ModelAdmin):
-    list_display = ['machine', 'agent', 'type_probleme', 'statut', 'date_blocage', 'date_deverrouillage']
+    list_display = ['machine', 'agent', 'type_probleme', 'statut', 'date_blocage', 'date_deverrouillage', 'match_distance']
+    list_select_related = ['machine', 'agent']
     list_filter = ['type_probleme', 'statut', 'date_blocage']
     search_fields = ['machine__nom_machine', 'agent__nom']
     list_editable = ['statut']
-    date_hierarchy = 'date_blocage'
\ No newline at end of file
+    date_hierarchy = 'date_blocage'
+
+@admin.register(InterventionDailyStats)
+class InterventionDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['day', 'machine', 'type_probleme', 'count', 'resolved_count', 'mean_duration', 'p95_duration']
+    list_select_related = ['machine']
+    list_filter = ['type_probleme', 'day']
+    date_hierarchy = 'day'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class InterventionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'interventions'
\ No newline at end of file
+    name = 'interventions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
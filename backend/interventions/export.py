@@ -0,0 +1,115 @@
+"""
+Export en flux (CSV ou NDJSON) de l'historique des interventions
+
+Les lignes sont lues par lots successifs sur (date_blocage, id) : chaque
+lot est une requête courte servie par l'index, sans OFFSET ni curseur
+serveur, de sorte que la mémoire reste constante quel que soit le nombre
+de lignes, y compris sur MySQL où .iterator() charge tout le résultat.
+"""
+import csv
+import io
+import json
+
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (colonne exportée, champ lu avec jointure)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('date_blocage', 'date_blocage'),
+    ('date_deverrouillage', 'date_deverrouillage'),
+    ('type_probleme', 'type_probleme'),
+    ('statut', 'statut'),
+    ('machine_id', 'machine_id'),
+    ('machine', 'machine__nom_machine'),
+    ('localisation', 'machine__localisation'),
+    ('agent_id', 'agent_id'),
+    ('agent', 'agent__nom'),
+    ('role', 'agent__role'),
+    ('match_distance', 'match_distance'),
+    ('match_confidence', 'match_confidence'),
+    ('description', 'description'),
+]
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Génère les lignes (tuples dans l'ordre d'EXPORT_COLUMNS), plus récentes
+    d'abord, par lots de chunk_size
+    """
+    fields = [field for _, field in EXPORT_COLUMNS]
+    date_index = fields.index('date_blocage')
+    id_index = fields.index('id')
+    queryset = queryset.order_by('-date_blocage', '-id').values_list(*fields)
+
+    last = None
+    while True:
+        batch = queryset
+        if last is not None:
+            last_date, last_id = last
+            # Équivalent à (date < d) OU (date = d ET id < i), écrit sans OR
+            # pour que la base parcoure l'index sur date_blocage
+            batch = batch.filter(date_blocage__lte=last_date).exclude(date_blocage=last_date, id__gte=last_id)
+        rows = list(batch[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][date_index], rows[-1][id_index]
+
+
+def _format_value(value):
+    if hasattr(value, 'isoformat'):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Génère le CSV (en-tête puis un bloc de texte par lot de lignes)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    yield buffer.getvalue()
+
+    for chunk in _chunks(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_format_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Génère un objet JSON par ligne
+    """
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(names, map(_format_value, row))), ensure_ascii=False) + '\n'
+            for row in chunk
+        )
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
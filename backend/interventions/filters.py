@@ -0,0 +1,106 @@
+"""
+Filtres de la liste des interventions (paramètres de requête)
+
+    ?machine=3&statut=en_cours&type_probleme=technique
+    &date_from=2024-01-01&date_to=2024-01-31T18:00
+"""
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Intervention
+
+
+def _parse_bound(value, name, end=False):
+    """
+    Convertit une date ou une date-heure ISO en datetime aware
+
+    Une date seule couvre toute la journée : date_to=2024-01-31 inclut le 31.
+    """
+    try:
+        moment = parse_datetime(value)
+        day = None if moment else parse_date(value)
+    except ValueError:
+        moment = day = None
+
+    if moment is None and day is None:
+        raise ValidationError({name: "Date invalide, format attendu AAAA-MM-JJ ou AAAA-MM-JJTHH:MM."})
+
+    if day is not None:
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, day is not None
+
+
+def filter_interventions(queryset, params):
+    """
+    Applique les filtres machine, statut, type_probleme, date_from et date_to
+    """
+    machine = params.get('machine')
+    if machine:
+        if not machine.isdigit():
+            raise ValidationError({'machine': "Identifiant de machine invalide."})
+        queryset = queryset.filter(machine_id=int(machine))
+
+    statut = params.get('statut')
+    if statut:
+        if statut not in dict(Intervention.STATUS_CHOICES):
+            raise ValidationError({'statut': f"Statut inconnu : {statut}."})
+        queryset = queryset.filter(statut=statut)
+
+    type_probleme = params.get('type_probleme')
+    if type_probleme:
+        if type_probleme not in dict(Intervention.PROBLEM_TYPES):
+            raise ValidationError({'type_probleme': f"Type de problème inconnu : {type_probleme}."})
+        queryset = queryset.filter(type_probleme=type_probleme)
+
+    # Bornes sur la colonne elle-même (pas de __date) pour profiter des index
+    date_from = params.get('date_from')
+    if date_from:
+        moment, _ = _parse_bound(date_from, 'date_from')
+        queryset = queryset.filter(date_blocage__gte=moment)
+
+    date_to = params.get('date_to')
+    if date_to:
+        moment, whole_day = _parse_bound(date_to, 'date_to', end=True)
+        if whole_day:
+            queryset = queryset.filter(date_blocage__lt=moment)
+        else:
+            queryset = queryset.filter(date_blocage__lte=moment)
+
+    return queryset
+
+
+def filter_daily_stats(queryset, params):
+    """
+    Applique les filtres machine, type_probleme, date_from et date_to (jours) aux agrégats
+    """
+    machine = params.get('machine')
+    if machine:
+        if not machine.isdigit():
+            raise ValidationError({'machine': "Identifiant de machine invalide."})
+        queryset = queryset.filter(machine_id=int(machine))
+
+    type_probleme = params.get('type_probleme')
+    if type_probleme:
+        if type_probleme not in dict(Intervention.PROBLEM_TYPES):
+            raise ValidationError({'type_probleme': f"Type de problème inconnu : {type_probleme}."})
+        queryset = queryset.filter(type_probleme=type_probleme)
+
+    for name, lookup in (('date_from', 'day__gte'), ('date_to', 'day__lte')):
+        value = params.get(name)
+        if value:
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValidationError({name: "Date invalide, format attendu AAAA-MM-JJ."})
+            queryset = queryset.filter(**{lookup: day})
+
+    return queryset
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from interventions.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit les agrégats journaliers des interventions "
+        "(après un import, une mise à jour en masse ou une correction de données)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Ne reconstruire qu'à partir de ce jour (AAAA-MM-JJ)")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("Date invalide pour --since, format attendu AAAA-MM-JJ.")
+
+        start = time.perf_counter()
+        written = rebuild(since)
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} agrégats reconstruits en {time.perf_counter() - start:.1f} s"
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('machines', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Intervention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_probleme', models.CharField(choices=[('matière', 'Problème Matière'), ('technique', 'Problème Technique'), ('câblage', 'Problème Câblage')], max_length=20)),
+                ('statut', models.CharField(choices=[('en_cours', 'En cours'), ('résolu', 'Résolu')], default='en_cours', max_length=20)),
+                ('date_blocage', models.DateTimeField(auto_now_add=True)),
+                ('date_deverrouillage', models.DateTimeField(blank=True, null=True)),
+                ('description', models.TextField(blank=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interventions', to=settings.AUTH_USER_MODEL)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interventions', to='machines.machine')),
+            ],
+            options={
+                'verbose_name': 'Intervention',
+                'verbose_name_plural': 'Interventions',
+                'ordering': ['-date_blocage'],
+            },
+        ),
+    ]
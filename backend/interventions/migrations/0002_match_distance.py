@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interventions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='intervention',
+            name='match_confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='intervention',
+            name='match_distance',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interventions', '0002_match_distance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['agent', '-date_blocage'], name='interv_agent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['-date_blocage'], name='interv_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['machine', 'statut'], name='interv_machine_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='intervention',
+            index=models.Index(fields=['statut', '-date_blocage'], name='interv_statut_date_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0001_initial'),
+        ('interventions', '0003_intervention_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterventionDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('type_probleme', models.CharField(choices=[('matière', 'Problème Matière'), ('technique', 'Problème Technique'), ('câblage', 'Problème Câblage')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('resolved_count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.FloatField(default=0)),
+                ('mean_duration', models.FloatField(blank=True, null=True)),
+                ('p95_duration', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='machines.machine')),
+            ],
+            options={
+                'verbose_name': 'Statistique journalière',
+                'verbose_name_plural': 'Statistiques journalières',
+                'ordering': ['-day', 'machine', 'type_probleme'],
+                'indexes': [models.Index(fields=['day'], name='interv_stats_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='interventiondailystats',
+            constraint=models.UniqueConstraint(fields=('machine', 'day', 'type_probleme'), name='interv_stats_group_uniq'),
+        ),
+    ]
@@ -21,6 +21,8 @@ class Intervention(models.Model):
     date_blocage = models.DateTimeField(auto_now_add=True)
     date_deverrouillage = models.DateTimeField(null=True, blank=True)
     description = models.TextField(blank=True)
+    match_distance = models.FloatField(null=True, blank=True)  # Distance Face ID au déverrouillage
+    match_confidence = models.FloatField(null=True, blank=True)
     
     def __str__(self):
         return f"{self.machine.nom_machine} - {self.type_probleme} - {self.statut}"
@@ -28,4 +30,46 @@ class Intervention(models.Model):
     class Meta:
         verbose_name = "Intervention"
         verbose_name_plural = "Interventions"
-        ordering = ['-date_blocage']
\ No newline at end of file
+        ordering = ['-date_blocage']
+        indexes = [
+            # Historique d'un agent, liste admin et date_hierarchy
+            models.Index(fields=['agent', '-date_blocage'], name='interv_agent_date_idx'),
+            models.Index(fields=['-date_blocage'], name='interv_date_idx'),
+            # Interventions en cours d'une machine
+            models.Index(fields=['machine', 'statut'], name='interv_machine_statut_idx'),
+            # Tableau de bord superviseur : en cours, plus récentes d'abord
+            models.Index(fields=['statut', '-date_blocage'], name='interv_statut_date_idx'),
+        ]
+
+class InterventionDailyStats(models.Model):
+    """
+    Agrégat journalier des interventions par machine et type de problème
+    
+    Maintenu par interventions.stats à chaque enregistrement d'intervention ;
+    reconstruit par la commande rebuild_intervention_stats.
+    Les durées (en secondes) vont du blocage au déverrouillage des
+    interventions résolues.
+    """
+    machine = models.ForeignKey(Machine, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    type_probleme = models.CharField(max_length=20, choices=Intervention.PROBLEM_TYPES)
+    count = models.PositiveIntegerField(default=0)
+    resolved_count = models.PositiveIntegerField(default=0)
+    total_duration = models.FloatField(default=0)
+    mean_duration = models.FloatField(null=True, blank=True)
+    p95_duration = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.machine_id} - {self.day} - {self.type_probleme}"
+    
+    class Meta:
+        verbose_name = "Statistique journalière"
+        verbose_name_plural = "Statistiques journalières"
+        ordering = ['-day', 'machine', 'type_probleme']
+        constraints = [
+            models.UniqueConstraint(fields=['machine', 'day', 'type_probleme'], name='interv_stats_group_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='interv_stats_day_idx'),
+        ]
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Intervention
+from .models import Intervention, InterventionDailyStats
 from agents.serializers import AgentSerializer
 from machines.serializers import MachineSerializer
 
@@ -14,11 +14,21 @@ class InterventionSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'machine', 'agent', 'machine_id', 'agent_id',
             'type_probleme', 'statut', 'date_blocage', 'date_deverrouillage',
-            'description'
+            'description', 'match_distance', 'match_confidence'
         ]
-        read_only_fields = ['id', 'date_blocage']
+        read_only_fields = ['id', 'date_blocage', 'match_distance', 'match_confidence']
 
 class InterventionCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Intervention
-        fields = ['machine_id', 'agent_id', 'type_probleme', 'description']
\ No newline at end of file
+        fields = ['machine_id', 'agent_id', 'type_probleme', 'description']
+
+class InterventionDailyStatsSerializer(serializers.ModelSerializer):
+    machine_nom = serializers.CharField(source='machine.nom_machine', read_only=True)
+    
+    class Meta:
+        model = InterventionDailyStats
+        fields = [
+            'machine', 'machine_nom', 'day', 'type_probleme', 'count', 'resolved_count',
+            'total_duration', 'mean_duration', 'p95_duration'
+        ]
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from faceid_factory.events import publish_machine_event
+from .models import Intervention
+from .stats import group_of, schedule_refresh
+
+
+@receiver(post_init, sender=Intervention)
+def remember_initial_state(sender, instance, **kwargs):
+    # Groupe d'origine : s'il change (machine, type), l'ancien doit aussi être recalculé
+    deferred = instance.get_deferred_fields()
+    if {'machine_id', 'date_blocage', 'type_probleme'} & deferred:
+        # Ne pas déclencher de requête pour un champ différé (.only(), .defer())
+        instance._stats_group = None
+    else:
+        instance._stats_group = group_of(instance)
+    instance._initial_statut = None if 'statut' in deferred else instance.statut
+
+
+@receiver(post_save, sender=Intervention)
+def update_daily_stats(sender, instance, **kwargs):
+    """
+    Met à jour l'agrégat journalier après création ou résolution
+    """
+    schedule_refresh(instance._stats_group, group_of(instance))
+    instance._stats_group = group_of(instance)
+
+
+@receiver(post_save, sender=Intervention)
+def publish_intervention_event(sender, instance, created, **kwargs):
+    """
+    Notifie les clients abonnés (SSE) d'une création ou d'une résolution
+    """
+    if created:
+        event_type = 'intervention.created'
+    elif instance.statut == 'résolu' and instance._initial_statut != 'résolu':
+        event_type = 'intervention.resolved'
+    else:
+        event_type = None
+    instance._initial_statut = instance.statut
+
+    if event_type is None:
+        return
+    event = {
+        'type': event_type,
+        'intervention_id': instance.id,
+        'statut': instance.statut,
+        'type_probleme': instance.type_probleme,
+    }
+    transaction.on_commit(lambda: publish_machine_event(instance.machine_id, event))
+
+
+@receiver(post_delete, sender=Intervention)
+def remove_from_daily_stats(sender, instance, **kwargs):
+    schedule_refresh(group_of(instance))
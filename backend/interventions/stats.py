@@ -0,0 +1,136 @@
+"""
+Agrégats journaliers des interventions (InterventionDailyStats)
+
+Un groupe = (machine, jour local de blocage, type de problème). Chaque
+enregistrement d'intervention recalcule son groupe à partir de ses seules
+lignes (quelques dizaines au plus), ce qui garde le p95 exact sans jamais
+parcourir toute la table.
+"""
+import datetime
+import math
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Intervention, InterventionDailyStats
+
+
+def group_of(intervention):
+    """
+    Retourne le groupe (machine_id, jour, type) d'une intervention
+    """
+    if intervention.date_blocage is None:
+        return None
+    return (
+        intervention.machine_id,
+        timezone.localdate(intervention.date_blocage),
+        intervention.type_probleme,
+    )
+
+
+def day_bounds(day):
+    """
+    Début et fin (exclue) d'un jour local, en datetimes aware
+    """
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+    return start, end
+
+
+def percentile(sorted_values, fraction):
+    """
+    Percentile par rang le plus proche d'une liste triée
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def compute_stats(rows):
+    """
+    Calcule les champs d'agrégat à partir de (date_blocage, date_deverrouillage)
+    """
+    count = 0
+    durations = []
+    for blocked, unlocked in rows:
+        count += 1
+        if unlocked is not None:
+            durations.append(max(0.0, (unlocked - blocked).total_seconds()))
+    durations.sort()
+    total = sum(durations)
+    return {
+        'count': count,
+        'resolved_count': len(durations),
+        'total_duration': total,
+        'mean_duration': total / len(durations) if durations else None,
+        'p95_duration': percentile(durations, 0.95),
+    }
+
+
+def refresh_group(machine_id, day, type_probleme):
+    """
+    Recalcule (ou supprime s'il est vide) l'agrégat d'un groupe
+    """
+    start, end = day_bounds(day)
+    rows = Intervention.objects.filter(
+        machine_id=machine_id,
+        type_probleme=type_probleme,
+        date_blocage__gte=start,
+        date_blocage__lt=end,
+    ).values_list('date_blocage', 'date_deverrouillage')
+
+    stats = compute_stats(rows)
+    group = {'machine_id': machine_id, 'day': day, 'type_probleme': type_probleme}
+    if stats['count'] == 0:
+        InterventionDailyStats.objects.filter(**group).delete()
+    else:
+        InterventionDailyStats.objects.update_or_create(defaults=stats, **group)
+
+
+def schedule_refresh(*groups):
+    """
+    Recalcule les groupes après validation de la transaction en cours
+    """
+    for group in set(filter(None, groups)):
+        transaction.on_commit(lambda group=group: refresh_group(*group))
+
+
+def rebuild(since=None, batch_size=1000):
+    """
+    Reconstruit tous les agrégats (à partir du jour `since` si fourni)
+    
+    Retourne le nombre de groupes écrits.
+    """
+    interventions = Intervention.objects.order_by('machine_id', 'type_probleme', 'date_blocage')
+    existing = InterventionDailyStats.objects.all()
+    if since is not None:
+        interventions = interventions.filter(date_blocage__gte=day_bounds(since)[0])
+        existing = existing.filter(day__gte=since)
+
+    def flush(group, rows, pending):
+        if group is not None:
+            machine_id, day, type_probleme = group
+            pending.append(InterventionDailyStats(
+                machine_id=machine_id, day=day, type_probleme=type_probleme, **compute_stats(rows)
+            ))
+
+    written = 0
+    with transaction.atomic():
+        existing.delete()
+        group, rows, pending = None, [], []
+        values = interventions.values_list('machine_id', 'type_probleme', 'date_blocage', 'date_deverrouillage')
+        for machine_id, type_probleme, blocked, unlocked in values.iterator(chunk_size=5000):
+            current = (machine_id, timezone.localdate(blocked), type_probleme)
+            if current != group:
+                flush(group, rows, pending)
+                group, rows = current, []
+                if len(pending) >= batch_size:
+                    InterventionDailyStats.objects.bulk_create(pending)
+                    written += len(pending)
+                    pending = []
+            rows.append((blocked, unlocked))
+        flush(group, rows, pending)
+        InterventionDailyStats.objects.bulk_create(pending)
+        written += len(pending)
+    return written
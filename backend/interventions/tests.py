@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from agents.models import Agent
+from faceid_factory.pagination import InterventionPagination
+from machines.models import Machine
+from .models import Intervention
+
+
+class InterventionQueryCountTests(TestCase):
+    """
+    Nombre de requêtes constant quel que soit le nombre d'interventions (pas de N+1)
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Agent.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pw', nom='Admin', role='admin'
+        )
+        for i in range(5):
+            agent = Agent.objects.create_user(
+                username=f'a{i}', email=f'a{i}@example.com', password='pw', nom=f'A{i}', role='qualité'
+            )
+            machine = Machine.objects.create(nom_machine=f'M{i}', localisation=f'L{i}')
+            Intervention.objects.create(machine=machine, agent=agent, type_probleme='matière')
+        cls.intervention = Intervention.objects.first()
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_list(self):
+        # count + page avec agent et machine en jointure
+        with self.assertNumQueries(2):
+            response = self.api.get('/api/interventions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len({row['machine']['id'] for row in response.data['results']}), 5)
+
+    def test_detail(self):
+        with self.assertNumQueries(1):
+            response = self.api.get(f'/api/interventions/{self.intervention.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['agent']['id'], self.intervention.agent_id)
+
+    def test_resolve(self):
+        # lecture avec jointure + mise à jour, puis après validation le recalcul
+        # de l'agrégat journalier : durées du groupe, update_or_create (lecture,
+        # insertion, 2 savepoints chacun)
+        with self.assertNumQueries(9), self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post(f'/api/interventions/{self.intervention.id}/resolve/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['statut'], 'résolu')
+
+    def test_admin_changelist(self):
+        self.client.force_login(self.admin)
+        # session, utilisateur, deux count, page en jointure, bornes et jours de date_hierarchy
+        with self.assertNumQueries(7):
+            response = self.client.get('/admin/interventions/intervention/')
+        self.assertEqual(response.status_code, 200)
+
+
+class InterventionCursorPaginationTests(TestCase):
+    """
+    Curseur composite (date_blocage, id) : pas de saut ni de doublon entre
+    deux pages, même quand plusieurs interventions partagent la même date
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Agent.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pw', nom='Admin', role='admin'
+        )
+        machine = Machine.objects.create(nom_machine='M', localisation='L')
+        for i in range(7):
+            Intervention.objects.create(machine=machine, agent=cls.admin, type_probleme='matière')
+        # Deux groupes de dates identiques, à cheval sur les pages
+        now = timezone.now()
+        ids = list(Intervention.objects.order_by('id').values_list('id', flat=True))
+        Intervention.objects.filter(id__in=ids[:4]).update(date_blocage=now)
+        Intervention.objects.filter(id__in=ids[4:]).update(date_blocage=now - timezone.timedelta(hours=1))
+        cls.expected = list(Intervention.objects.order_by('-date_blocage', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        patcher = mock.patch.object(InterventionPagination, 'page_size', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pages(self, url):
+        pages = []
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def test_follow_next(self):
+        pages = self.pages('/api/interventions/?pagination=cursor')
+        ids = [row['id'] for page in pages for row in page['results']]
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+
+    def test_follow_previous(self):
+        pages = self.pages('/api/interventions/?pagination=cursor')
+        response = self.api.get(pages[2]['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[3:6])
+        response = self.api.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], self.expected[:3])
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(response.data['next'], pages[0]['next'])
+
+    def test_keyset_without_offset(self):
+        first = self.api.get('/api/interventions/?pagination=cursor')
+        with CaptureQueriesContext(connection) as queries:
+            self.api.get(first.data['next'])
+        sql = queries.captured_queries[-1]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertIn('"DATE_BLOCAGE" <', sql)
+
+    def test_invalid_cursor(self):
+        response = self.api.get('/api/interventions/?cursor=pas-un-curseur')
+        self.assertEqual(response.status_code, 404)
@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('', views.InterventionListCreateView.as_view(), name='intervention-list-create'),
+    path('export/', views.export_interventions, name='intervention-export'),
+    path('stats/daily/', views.InterventionDailyStatsView.as_view(), name='intervention-stats-daily'),
+    path('stats/summary/', views.intervention_stats_summary, name='intervention-stats-summary'),
     path('<int:pk>/', views.InterventionDetailView.as_view(), name='intervention-detail'),
     path('<int:pk>/resolve/', views.resolve_intervention, name='resolve-intervention'),
 ]
\ No newline at end of file
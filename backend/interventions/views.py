@@ -2,19 +2,32 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db.models import Max, Sum
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from .models import Intervention
-from .serializers import InterventionSerializer, InterventionCreateSerializer
+from faceid_factory.pagination import InterventionPagination
+from .export import EXPORT_FORMATS, STREAMS, iter_rows
+from .filters import filter_daily_stats, filter_interventions
+from .models import Intervention, InterventionDailyStats
+from .serializers import InterventionSerializer, InterventionCreateSerializer, InterventionDailyStatsSerializer
+
+def intervention_queryset():
+    """
+    Interventions avec agent et machine chargés dans la même requête (jointure)
+    """
+    # L'encodage du visage n'est pas sérialisé : inutile de le transférer
+    return Intervention.objects.select_related('agent', 'machine').defer('agent__face_encoding')
 
 class InterventionListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = InterventionPagination
     
     def get_queryset(self):
-        queryset = Intervention.objects.all()
+        queryset = intervention_queryset()
         # Filtrer par agent si ce n'est pas un admin
         if self.request.user.role != 'admin':
-            queryset = queryset.filter(agent=self.request.user)
-        return queryset
+            queryset = queryset.filter(agent_id=self.request.user.id)
+        return filter_interventions(queryset, self.request.query_params)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -22,7 +35,7 @@ class InterventionListCreateView(generics.ListCreateAPIView):
         return InterventionSerializer
 
 class InterventionDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Intervention.objects.all()
+    queryset = intervention_queryset()
     serializer_class = InterventionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -30,7 +43,7 @@ class InterventionDetailView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([IsAuthenticated])
 def resolve_intervention(request, pk):
     try:
-        intervention = Intervention.objects.get(pk=pk)
+        intervention = intervention_queryset().get(pk=pk)
         intervention.statut = 'résolu'
         intervention.date_deverrouillage = timezone.now()
         intervention.save()
@@ -38,4 +51,78 @@ def resolve_intervention(request, pk):
         serializer = InterventionSerializer(intervention)
         return Response(serializer.data)
     except Intervention.DoesNotExist:
-        return Response({'error': 'Intervention non trouvée'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({'error': 'Intervention non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_interventions(request):
+    """
+    Exporte l'historique filtré en CSV (?output=csv, par défaut) ou NDJSON (?output=ndjson)
+    
+    Accepte les mêmes filtres que la liste : machine, statut, type_probleme, date_from, date_to.
+    """
+    output = request.query_params.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        return Response({'output': f"Format inconnu : {output} (csv ou ndjson)."}, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = Intervention.objects.all()
+    if request.user.role != 'admin':
+        queryset = queryset.filter(agent_id=request.user.id)
+    queryset = filter_interventions(queryset, request.query_params)
+    
+    response = StreamingHttpResponse(STREAMS[output](iter_rows(queryset)), content_type=EXPORT_FORMATS[output])
+    filename = f"interventions-{timezone.localdate():%Y%m%d}.{output}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+class InterventionDailyStatsView(generics.ListAPIView):
+    """
+    Agrégats journaliers par machine et type de problème (lecture seule)
+    """
+    serializer_class = InterventionDailyStatsSerializer
+    permission_classes = [IsAuthenticated]
+    # Séries pour graphiques : bornées par date_from / date_to
+    pagination_class = None
+    
+    def get_queryset(self):
+        queryset = InterventionDailyStats.objects.select_related('machine')
+        return filter_daily_stats(queryset, self.request.query_params)
+
+STATS_GROUPS = {
+    'machine': ['machine', 'machine__nom_machine'],
+    'type_probleme': ['type_probleme'],
+    'day': ['day'],
+}
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def intervention_stats_summary(request):
+    """
+    Totaux sur la période, regroupés par machine (défaut), type_probleme ou day
+    
+    Le p95 n'est exact qu'à la journée : max_daily_p95 est le plus grand p95 journalier du groupe.
+    """
+    group_by = request.query_params.get('group_by', 'machine')
+    if group_by not in STATS_GROUPS:
+        return Response({'group_by': f"Regroupement inconnu : {group_by}."}, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = filter_daily_stats(InterventionDailyStats.objects.all(), request.query_params)
+    rows = (
+        queryset
+        .values(*STATS_GROUPS[group_by])
+        .annotate(
+            count=Sum('count'),
+            resolved_count=Sum('resolved_count'),
+            total_duration=Sum('total_duration'),
+            max_daily_p95=Max('p95_duration'),
+        )
+        .order_by(*STATS_GROUPS[group_by])
+    )
+    
+    results = []
+    for row in rows:
+        if 'machine__nom_machine' in row:
+            row['machine_nom'] = row.pop('machine__nom_machine')
+        row['mean_duration'] = row['total_duration'] / row['resolved_count'] if row['resolved_count'] else None
+        results.append(row)
+    return Response(results)
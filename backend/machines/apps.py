@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class MachinesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'machines'
\ No newline at end of file
+    name = 'machines'
+
+    def ready(self):
+        from . import signals  # noqa: F401
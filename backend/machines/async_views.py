@@ -0,0 +1,121 @@
+"""
+Flux temps réel (Server-Sent Events) de l'état des machines, servi sous ASGI
+
+    GET /api/machines/events/?token=<jwt>             toutes les machines
+    GET /api/machines/<id>/events/?token=<jwt>        une machine
+    GET /api/machines/events/?machine=1,4&token=...   plusieurs machines
+
+EventSource ne permet pas d'envoyer d'en-tête Authorization : le jeton
+d'accès peut être passé en paramètre ?token=. Après une reconnexion ou un
+événement 'resync', le client recharge l'état via l'API REST.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from agents.authentication import ClaimsJWTAuthentication
+from faceid_factory.events import ALL_MACHINES, get_broker, machine_channel
+
+
+def _raw_token(request):
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):]
+    return request.GET.get('token')
+
+
+async def authenticate(request):
+    """
+    Retourne l'agent correspondant au jeton, ou None
+    """
+    raw_token = _raw_token(request)
+    if not raw_token:
+        return None
+    authentication = ClaimsJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def format_event(event):
+    return f"id: {event.get('id', '')}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def event_stream(subscription, keepalive, max_duration):
+    """
+    Génère le flux SSE ; se termine après max_duration secondes
+    
+    Django 4.2 ne signale pas la déconnexion du client pendant un flux :
+    la durée bornée libère l'abonnement d'un client parti, et EventSource
+    se reconnecte de lui-même.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_duration
+    try:
+        # Délai de reconnexion conseillé au navigateur (ms)
+        yield 'retry: 3000\n\n'
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(subscription.get(), min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        subscription.close()
+
+
+async def machine_events(request, pk=None):
+    """
+    Diffuse les événements intervention.created, intervention.resolved,
+    machine.created et machine.updated
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Méthode non autorisée.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    # Sous WSGI, un flux infini bloquerait un worker
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'detail': "Flux d'événements disponible uniquement sous ASGI."},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+
+    agent = await authenticate(request)
+    if agent is None or not agent.is_active:
+        return JsonResponse({'detail': 'Authentification requise.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if pk is not None:
+        channels = [machine_channel(pk)]
+    elif request.GET.get('machine'):
+        try:
+            channels = [machine_channel(int(machine_id)) for machine_id in request.GET['machine'].split(',')]
+        except ValueError:
+            return JsonResponse({'machine': 'Identifiants de machine invalides.'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        channels = [ALL_MACHINES]
+
+    subscription = get_broker().subscribe(channels)
+    response = StreamingHttpResponse(
+        event_stream(
+            subscription,
+            getattr(settings, 'EVENTS_KEEPALIVE', 15),
+            getattr(settings, 'EVENTS_MAX_DURATION', 300)
+        ),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Désactive la mise en tampon de Nginx pour ce flux
+    response['X-Accel-Buffering'] = 'no'
+    return response
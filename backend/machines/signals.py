@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from faceid_factory.events import publish_machine_event
+from .models import Machine
+
+
+@receiver(post_init, sender=Machine)
+def remember_initial_state(sender, instance, **kwargs):
+    instance._initial_is_active = None if 'is_active' in instance.get_deferred_fields() else instance.is_active
+
+
+@receiver(post_save, sender=Machine)
+def publish_machine_state(sender, instance, created, **kwargs):
+    """
+    Notifie les clients abonnés (SSE) de la mise en service ou hors service d'une machine
+    """
+    if not created and instance.is_active == instance._initial_is_active:
+        return
+    instance._initial_is_active = instance.is_active
+
+    event = {
+        'type': 'machine.created' if created else 'machine.updated',
+        'is_active': instance.is_active,
+    }
+    transaction.on_commit(lambda: publish_machine_event(instance.id, event))
@@ -1,7 +1,9 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     path('', views.MachineListCreateView.as_view(), name='machine-list-create'),
     path('<int:pk>/', views.MachineDetailView.as_view(), name='machine-detail'),
+    path('events/', async_views.machine_events, name='machine-events'),
+    path('<int:pk>/events/', async_views.machine_events, name='machine-detail-events'),
 ]
\ No newline at end of file
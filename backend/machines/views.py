@@ -1,5 +1,6 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from faceid_factory.pagination import OptInCursorPagination
 from .models import Machine
 from .serializers import MachineSerializer
 
@@ -7,6 +8,7 @@ class MachineListCreateView(generics.ListCreateAPIView):
     queryset = Machine.objects.filter(is_active=True)
     serializer_class = MachineSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
 
 class MachineDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Machine.objects.all()
@@ -8,10 +8,15 @@ import { Loader2, UserCheck, UserX, Video, VideoOff } from 'lucide-react';
 import { agentService, faceRecognitionService } from '../services/api';
 import { useToast } from '../hooks/use-toast';
 
+// Rafale envoyée au serveur : un clignement ou un flou de bougé n'impose pas de recommencer
+const BURST_FRAMES = 5;
+const BURST_INTERVAL_MS = 100;
+
 export const FaceIdModal = ({ isOpen, onClose, onUnlock, problemType, machineId }) => {
   const [agents, setAgents] = useState([]);
   const [selectedAgentId, setSelectedAgentId] = useState('');
   const [capturedPhotoDataUri, setCapturedPhotoDataUri] = useState(null);
+  const [capturedFrames, setCapturedFrames] = useState([]);
   const [status, setStatus] = useState('idle');
   const [resultMessage, setResultMessage] = useState('');
   const [hasCameraPermission, setHasCameraPermission] = useState(null);
@@ -71,6 +76,7 @@ export const FaceIdModal = ({ isOpen, onClose, onUnlock, problemType, machineId
   const resetState = useCallback(() => {
     setSelectedAgentId('');
     setCapturedPhotoDataUri(null);
+    setCapturedFrames([]);
     setStatus('capturing');
     setResultMessage('');
   }, []);
@@ -81,7 +87,7 @@ export const FaceIdModal = ({ isOpen, onClose, onUnlock, problemType, machineId
     onClose();
   };
 
-  const handleCapture = () => {
+  const handleCapture = async () => {
     if (videoRef.current && canvasRef.current) {
       const video = videoRef.current;
       const canvas = canvasRef.current;
@@ -89,9 +95,16 @@ export const FaceIdModal = ({ isOpen, onClose, onUnlock, problemType, machineId
       canvas.height = video.videoHeight;
       const context = canvas.getContext('2d');
       if (context) {
-        context.drawImage(video, 0, 0, canvas.width, canvas.height);
-        const dataUri = canvas.toDataURL('image/jpeg');
-        setCapturedPhotoDataUri(dataUri);
+        const frames = [];
+        for (let i = 0; i < BURST_FRAMES; i++) {
+          if (i > 0) {
+            await new Promise((resolve) => setTimeout(resolve, BURST_INTERVAL_MS));
+          }
+          context.drawImage(video, 0, 0, canvas.width, canvas.height);
+          frames.push(canvas.toDataURL('image/jpeg'));
+        }
+        setCapturedFrames(frames);
+        setCapturedPhotoDataUri(frames[0]);
       }
     }
   };
@@ -109,8 +122,8 @@ export const FaceIdModal = ({ isOpen, onClose, onUnlock, problemType, machineId
     setStatus('loading');
 
     try {
-      const response = await faceRecognitionService.verifyFaceId({
-        live_photo: capturedPhotoDataUri,
+      const response = await faceRecognitionService.verifyFaceBurst({
+        live_photos: capturedFrames,
         agent_id: parseInt(selectedAgentId),
         problem_type: problemType,
         machine_id: machineId,
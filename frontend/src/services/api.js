@@ -74,6 +74,16 @@ export const machineService = {
   createMachine: (data) => api.post('/machines/', data),
   updateMachine: (id, data) => api.put(`/machines/${id}/`, data),
   deleteMachine: (id) => api.delete(`/machines/${id}/`),
+  // Événements temps réel (SSE) : retourne une fonction de désabonnement
+  subscribeEvents: (onEvent, machineId = null) => {
+    const token = localStorage.getItem('access_token');
+    const path = machineId ? `/machines/${machineId}/events/` : '/machines/events/';
+    const source = new EventSource(`${API_BASE_URL}${path}?token=${encodeURIComponent(token)}`);
+    ['intervention.created', 'intervention.resolved', 'machine.created', 'machine.updated', 'resync'].forEach(
+      (type) => source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)))
+    );
+    return () => source.close();
+  },
 };
 
 export const interventionService = {
@@ -82,7 +92,31 @@ export const interventionService = {
   resolveIntervention: (id) => api.post(`/interventions/${id}/resolve/`),
 };
 
+// Envoie la photo (data URL) en fichier JPEG multipart plutôt qu'en base64 dans du JSON
+const postPhoto = async (url, data, field) => {
+  const form = new FormData();
+  Object.entries(data).forEach(([key, value]) => {
+    if (key !== field) form.append(key, value);
+  });
+  const photo = await (await fetch(data[field])).blob();
+  form.append(field, photo, `${field}.jpg`);
+  return api.post(url, form, { headers: { 'Content-Type': 'multipart/form-data' } });
+};
+
+// Rafale : chaque capture en fichier JPEG multipart, sous le même champ
+const postPhotos = async (url, data, field) => {
+  const form = new FormData();
+  Object.entries(data).forEach(([key, value]) => {
+    if (key !== field) form.append(key, value);
+  });
+  const photos = await Promise.all(data[field].map(async (dataUri) => (await fetch(dataUri)).blob()));
+  photos.forEach((photo, index) => form.append(field, photo, `${field}_${index}.jpg`));
+  return api.post(url, form, { headers: { 'Content-Type': 'multipart/form-data' } });
+};
+
 export const faceRecognitionService = {
-  verifyFaceId: (data) => api.post('/face-recognition/verify/', data),
-  uploadFaceEncoding: (data) => api.post('/face-recognition/upload-encoding/', data),
+  verifyFaceId: (data) => postPhoto('/face-recognition/verify/', data, 'live_photo'),
+  verifyFaceBurst: (data) => postPhotos('/face-recognition/verify-burst/', data, 'live_photos'),
+  identifyFace: (data) => postPhoto('/face-recognition/identify/', data, 'live_photo'),
+  uploadFaceEncoding: (data) => postPhoto('/face-recognition/upload-encoding/', data, 'photo'),
 };
\ No newline at end of file